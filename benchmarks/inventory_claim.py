@@ -0,0 +1,123 @@
+"""Concurrent buyers and job workers on one listing's inventory: checks every unit is delivered once.
+
+Run from the repository root:
+
+    python -m benchmarks.inventory_claim [--buyers 16] [--workers 4] [--units 5000] [--quantity 5]
+
+The listing is stocked with ``--units`` distinct inventory items. Buyer
+threads place orders through POST /api/orders until it sells out, which
+only reserves stock and queues a job per order. Job worker threads then
+deliver the orders, each claiming its units in one batched UPDATE.
+Afterwards no unit may belong to two orders, every order must be completed
+with exactly its quantity of units, and the stock counter must equal the
+number of unclaimed units.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+from src.main import create_app, init_database
+from src.extensions import db
+from src.models.account import Account, Category, InventoryItem, Order
+from src.models.user import User
+from src.services.inventory import add_inventory
+from src.services.jobs import work
+
+def _run_threads(target, args_list):
+    threads = [threading.Thread(target=target, args=args) for args in args_list]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--buyers', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--units', type=int, default=5000)
+    parser.add_argument('--quantity', type=int, default=5)
+    args = parser.parse_args()
+    
+    path = os.path.join(tempfile.mkdtemp(), 'inventory.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'RATE_LIMIT_ENABLED': False})
+    init_database(app)
+    with app.app_context():
+        users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x')
+                 for i in range(args.buyers + 1)]
+        category = Category(name='Stress', slug='stress')
+        db.session.add_all(users + [category])
+        db.session.flush()
+        account = Account(seller_id=users[0].id, category_id=category.id, title='Hot listing',
+                          platform='Facebook', price=1, stock_quantity=0, min_order_quantity=1)
+        db.session.add(account)
+        db.session.flush()
+        add_inventory(account.id, [f'login{i}:password{i}' for i in range(args.units)])
+        db.session.commit()
+        account_id = account.id
+        tokens = [create_access_token(identity=str(user.id)) for user in users[1:]]
+    
+    outcomes = {'placed': 0, 'sold_out': 0, 'errors': 0, 'done': 0, 'retry': 0, 'dead': 0, 'lost': 0}
+    lock = threading.Lock()
+    
+    def buyer(token):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        body = {'account_id': account_id, 'quantity': args.quantity}
+        while True:
+            response = client.post('/api/orders', json=body, headers=headers)
+            with lock:
+                if response.status_code == 202:
+                    outcomes['placed'] += 1
+                elif response.status_code == 409:
+                    outcomes['sold_out'] += 1
+                    return
+                else:
+                    outcomes['errors'] += 1
+                    return
+    
+    def worker(index):
+        with app.app_context():
+            result = work(once=True, worker=f'bench-{index}')
+        with lock:
+            for outcome, count in result.items():
+                outcomes[outcome] += count
+    
+    placing = _run_threads(buyer, [(token,) for token in tokens])
+    delivering = _run_threads(worker, [(index,) for index in range(args.workers)])
+    
+    with app.app_context():
+        unclaimed = db.session.query(func.count(InventoryItem.id)).filter(InventoryItem.order_id.is_(None)).scalar()
+        claimed = db.session.query(func.count(InventoryItem.id), func.count(func.distinct(InventoryItem.order_id))) \
+            .filter(InventoryItem.order_id.isnot(None)).one()
+        per_order = dict(
+            db.session.query(Order.id, func.count(InventoryItem.id))
+            .outerjoin(InventoryItem, InventoryItem.order_id == Order.id)
+            .group_by(Order.id)
+        )
+        statuses = dict(db.session.query(Order.status, func.count(Order.id)).group_by(Order.status))
+        stock = db.session.get(Account, account_id).stock_quantity
+    
+    print(f'orders placed: {outcomes["placed"]} in {placing:.2f}s ({outcomes["placed"] / placing:.1f} orders/s)')
+    print(f'orders delivered by {args.workers} workers: {outcomes["done"]} in {delivering:.2f}s '
+          f'({outcomes["done"] / delivering:.1f} orders/s, {claimed[0] / delivering:.1f} units/s)')
+    print(f'units claimed: {claimed[0]} by {claimed[1]} orders, unclaimed: {unclaimed}, stock counter: {stock}, '
+          f'initial units: {args.units}')
+    print(f'order statuses: {statuses}, sold-out responses: {outcomes["sold_out"]}, errors: {outcomes["errors"]}, '
+          f'job retries: {outcomes["retry"]}, dead: {outcomes["dead"]}, lost leases: {outcomes["lost"]}')
+    broken = (
+        claimed[0] + unclaimed != args.units
+        or stock != unclaimed
+        or any(count != args.quantity for count in per_order.values())
+        or set(statuses) != {'completed'}
+    )
+    print('INCONSISTENT' if broken else 'every unit delivered exactly once')
+    if broken or outcomes['errors'] or outcomes['dead']:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
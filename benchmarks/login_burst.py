@@ -0,0 +1,97 @@
+"""Catalogue latency during a login burst, inline bcrypt vs the bounded hashing pool.
+
+Run from the repository root:
+
+    python -m benchmarks.login_burst [--attackers 16] [--seconds 5]
+
+Browser threads request GET /api/accounts in a loop and record latency.
+Three phases run: no logins, a login burst with bcrypt run inline on the
+request threads (BCRYPT_WORKERS=0), and the same burst with the default
+pool. Logins rejected with 429 are counted separately.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from src.main import create_app, init_database
+from src.extensions import db
+from src.models.account import Account, Category
+from src.models.user import User
+
+def _build_app(path, workers):
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'RATE_LIMIT_ENABLED': False}
+    if workers is not None:
+        config['BCRYPT_WORKERS'] = workers
+    return create_app(config)
+
+def _seed(app, listings):
+    with app.app_context():
+        hasher = app.extensions['password_hasher']
+        user = User(username='victim', email='victim@example.com', password_hash=hasher.hash('secret'))
+        category = Category(name='Bench', slug='bench')
+        db.session.add_all([user, category])
+        db.session.flush()
+        db.session.add_all([
+            Account(seller_id=user.id, category_id=category.id, title=f'Listing {i}',
+                    platform='Facebook', price=1, stock_quantity=10)
+            for i in range(listings)
+        ])
+        db.session.commit()
+
+def run(name, app, attackers, browsers, seconds):
+    stop = threading.Event()
+    latencies = []
+    logins = {'ok': 0, 'rejected': 0}
+    lock = threading.Lock()
+    
+    def browse():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/api/accounts?per_page=20')
+            with lock:
+                latencies.append(time.perf_counter() - started)
+    
+    def attack():
+        client = app.test_client()
+        while not stop.is_set():
+            response = client.post('/api/auth/login', json={'email': 'victim@example.com', 'password': 'secret'})
+            with lock:
+                logins['ok' if response.status_code == 200 else 'rejected'] += 1
+            if response.status_code == 429:
+                time.sleep(float(response.headers.get('Retry-After', 1)) / 10)
+    
+    threads = [threading.Thread(target=browse) for _ in range(browsers)]
+    threads += [threading.Thread(target=attack) for _ in range(attackers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+    print(f'{name:>14}: catalogue p50 {statistics.median(latencies) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  '
+          f'({len(latencies) / seconds:6.1f} req/s)  logins ok {logins["ok"]}, rejected {logins["rejected"]}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--attackers', type=int, default=16)
+    parser.add_argument('--browsers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+    
+    path = os.path.join(tempfile.mkdtemp(), 'login.db')
+    app = _build_app(path, None)
+    init_database(app)
+    _seed(app, 200)
+    
+    run('no logins', app, 0, args.browsers, args.seconds)
+    run('inline bcrypt', _build_app(path, 0), args.attackers, args.browsers, args.seconds)
+    run('hashing pool', app, args.attackers, args.browsers, args.seconds)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Concurrent order placement against one listing: proves no oversell, measures orders/s.
+
+Run from the repository root:
+
+    python -m benchmarks.order_stress [--buyers 16] [--stock 2000] [--quantity 3]
+
+Buyer threads place orders through POST /api/orders until the listing sells
+out. Afterwards the ordered quantities plus the remaining stock must equal
+the initial stock exactly. Every buyer also retries one request with the
+same Idempotency-Key, which must return the original order.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+from src.main import create_app, init_database
+from src.extensions import db
+from src.models.account import Account, Category, Order
+from src.models.user import User
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--buyers', type=int, default=16)
+    parser.add_argument('--stock', type=int, default=2000)
+    parser.add_argument('--quantity', type=int, default=3)
+    args = parser.parse_args()
+    
+    path = os.path.join(tempfile.mkdtemp(), 'orders.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'RATE_LIMIT_ENABLED': False})
+    init_database(app)
+    with app.app_context():
+        users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x')
+                 for i in range(args.buyers + 1)]
+        category = Category(name='Stress', slug='stress')
+        db.session.add_all(users + [category])
+        db.session.flush()
+        account = Account(seller_id=users[0].id, category_id=category.id, title='Hot listing',
+                          platform='Facebook', price=1, stock_quantity=args.stock, min_order_quantity=1)
+        db.session.add(account)
+        db.session.commit()
+        account_id = account.id
+        tokens = [create_access_token(identity=str(user.id)) for user in users[1:]]
+    
+    outcomes = {'placed': 0, 'sold_out': 0, 'errors': 0, 'idempotency_mismatch': 0}
+    lock = threading.Lock()
+    
+    def buyer(token):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        body = {'account_id': account_id, 'quantity': args.quantity}
+        
+        first = client.post('/api/orders', json=body, headers={**headers, 'Idempotency-Key': 'retry-me'})
+        again = client.post('/api/orders', json=body, headers={**headers, 'Idempotency-Key': 'retry-me'})
+        with lock:
+            if first.status_code == 202:
+                outcomes['placed'] += 1
+                if again.status_code != 200 or again.json['id'] != first.json['id']:
+                    outcomes['idempotency_mismatch'] += 1
+        
+        while True:
+            response = client.post('/api/orders', json=body, headers=headers)
+            with lock:
+                if response.status_code == 202:
+                    outcomes['placed'] += 1
+                elif response.status_code == 409:
+                    outcomes['sold_out'] += 1
+                    return
+                else:
+                    outcomes['errors'] += 1
+                    return
+    
+    threads = [threading.Thread(target=buyer, args=(token,)) for token in tokens]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    with app.app_context():
+        sold = db.session.query(func.coalesce(func.sum(Order.quantity), 0)).scalar()
+        remaining = db.session.get(Account, account_id).stock_quantity
+    
+    print(f'orders placed: {outcomes["placed"]} in {elapsed:.2f}s ({outcomes["placed"] / elapsed:.1f} orders/s)')
+    print(f'units sold: {sold}, stock left: {remaining}, initial stock: {args.stock}')
+    print(f'sold-out responses: {outcomes["sold_out"]}, errors: {outcomes["errors"]}, '
+          f'idempotency mismatches: {outcomes["idempotency_mismatch"]}')
+    oversold = sold + remaining != args.stock or remaining < 0
+    print('OVERSOLD' if oversold else 'no oversell')
+    if oversold or outcomes['errors'] or outcomes['idempotency_mismatch']:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
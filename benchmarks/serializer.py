@@ -0,0 +1,92 @@
+"""Listing serialization: Account.to_dict() + jsonify vs the columnar serializer.
+
+Run from the repository root:
+
+    python -m benchmarks.serializer [--rows 20000] [--page 100] [--stdlib]
+
+The database is seeded with ``--rows`` listings. Both paths then page
+through all of them ``--page`` rows at a time, loading each page of listings
+(with their category) and encoding it to JSON, as GET /api/accounts does.
+Reported are rows/s and the bytes allocated per page, measured with
+tracemalloc.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from flask import jsonify
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+from src.main import create_app, init_database
+from src.extensions import db
+from src.models.account import Account, Category
+from src.models.user import User
+from src.services import account_serializer
+from src.services.account_serializer import account_schema, encode_json
+from src.services.listings import listing_order
+
+def _seed(rows):
+    seller = User(username='bench', email='bench@example.com', password_hash='x')
+    categories = [Category(name=f'Category {i}', slug=f'category-{i}') for i in range(20)]
+    db.session.add_all([seller] + categories)
+    db.session.flush()
+    db.session.execute(insert(Account), [
+        dict(seller_id=seller.id, category_id=categories[i % 20].id, title=f'Listing {i}',
+             description='Aged account with email and 2FA included.', platform='Facebook',
+             account_type='Aged', price=i % 50 + 0.25, stock_quantity=100, country='USA',
+             rating=4.5, success_rate=98.5)
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+def to_dict_page(page, offset=0):
+    accounts = Account.query.options(joinedload(Account.category)).filter(Account.status == 'active') \
+        .order_by(*listing_order()).limit(page).offset(offset).all()
+    return jsonify({'accounts': [account.to_dict() for account in accounts]}).get_data()
+
+def columnar_page(page, offset=0):
+    schema = account_schema()
+    rows = schema.select(Account.query.filter(Account.status == 'active')) \
+        .order_by(*listing_order()).limit(page).offset(offset).all()
+    return encode_json({'accounts': schema.to_dicts(rows)})
+
+def measure(name, serialize, page, rows):
+    pages = max(rows // page, 1)
+    db.session.expunge_all()
+    started = time.perf_counter()
+    for index in range(pages):
+        serialize(page, index * page)
+        db.session.expunge_all()
+    elapsed = time.perf_counter() - started
+    
+    tracemalloc.start()
+    serialize(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.expunge_all()
+    print(f'{name:>22}: {pages * page / elapsed:10.0f} rows/s  {peak / 1024:8.0f} KiB peak per {page}-row page')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--stdlib', action='store_true', help='Encode with the stdlib json fallback')
+    args = parser.parse_args()
+    
+    path = os.path.join(tempfile.mkdtemp(), 'serializer.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    init_database(app)
+    with app.app_context(), app.test_request_context():
+        _seed(args.rows)
+        if args.stdlib:
+            account_serializer.orjson = None
+        if json.loads(to_dict_page(args.page)) != json.loads(columnar_page(args.page)):
+            raise SystemExit('The two serializers disagree')
+        measure('to_dict + jsonify', to_dict_page, args.page, args.rows)
+        measure(f'columnar ({"orjson" if account_serializer.orjson else "stdlib json"})',
+                columnar_page, args.page, args.rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Reader throughput on SQLite under a steady write load, default vs tuned pragmas.
+
+Run from the repository root:
+
+    python -m benchmarks.sqlite_concurrency [--readers 8] [--seconds 5]
+
+Each mode gets a fresh database file seeded with listings. One writer thread
+inserts and updates accounts in small transactions (like order placement and
+admin edits) while reader threads run the catalogue listing query.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from src.main import create_app, init_database
+from src.extensions import db
+from src.models.account import Account, Category
+from src.models.user import User
+from src.services.listings import filter_listings, listing_order
+
+DEFAULT_PRAGMAS = {
+    'SQLITE_JOURNAL_MODE': '',
+    'SQLITE_SYNCHRONOUS': '',
+    'SQLITE_BUSY_TIMEOUT_MS': '',
+    'SQLITE_CACHE_SIZE_KB': '',
+    'SQLITE_MMAP_SIZE': '',
+    'SQLITE_TEMP_STORE': '',
+}
+
+def _seed(listings):
+    seller = User(username='bench', email='bench@example.com', password_hash='x')
+    category = Category(name='Bench', slug='bench')
+    db.session.add_all([seller, category])
+    db.session.flush()
+    db.session.add_all([
+        Account(seller_id=seller.id, category_id=category.id, title=f'Listing {i}',
+                platform='Facebook', price=1 + i % 50, stock_quantity=100)
+        for i in range(listings)
+    ])
+    db.session.commit()
+    return seller.id, category.id
+
+def run(mode, overrides, readers, seconds, listings):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    # sqlite3's own connect timeout would otherwise act as a busy timeout in both modes
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': readers + 2, 'connect_args': {'timeout': 0}},
+    }
+    app = create_app({**config, **overrides})
+    init_database(app)
+    with app.app_context():
+        seller_id, category_id = _seed(listings)
+    
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+    lock = threading.Lock()
+    
+    def writer():
+        with app.app_context():
+            i = 0
+            while not stop.is_set():
+                try:
+                    db.session.add(Account(seller_id=seller_id, category_id=category_id, title=f'New {i}',
+                                           platform='Instagram', price=2, stock_quantity=10))
+                    account = db.session.get(Account, 1 + i % listings)
+                    account.stock_quantity = (account.stock_quantity or 0) + 1
+                    db.session.commit()
+                    key = 'writes'
+                except OperationalError:
+                    db.session.rollback()
+                    key = 'write_errors'
+                with lock:
+                    counts[key] += 1
+                i += 1
+    
+    def reader():
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    query, rank = filter_listings(Account.query, max_price=25)
+                    query.order_by(*listing_order(rank)).limit(20).all()
+                    db.session.rollback()
+                    key = 'reads'
+                except OperationalError:
+                    db.session.rollback()
+                    key = 'read_errors'
+                with lock:
+                    counts[key] += 1
+    
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    
+    with app.app_context():
+        db.engine.dispose()
+    print(f'{mode:>8}: {counts["reads"] / seconds:9.1f} reads/s  {counts["writes"] / seconds:8.1f} writes/s  '
+          f'errors: {counts["read_errors"]} read, {counts["write_errors"]} write (database is locked)')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--listings', type=int, default=5000)
+    args = parser.parse_args()
+    
+    run('default', DEFAULT_PRAGMAS, args.readers, args.seconds, args.listings)
+    run('tuned', {}, args.readers, args.seconds, args.listings)
+
+if __name__ == '__main__':
+    main()
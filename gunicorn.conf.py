@@ -0,0 +1,42 @@
+# Gunicorn settings for `gunicorn -c gunicorn.conf.py src.wsgi:app`.
+# Values come from src.config.Config so they can be tuned with the same
+# environment variables as the application (WEB_CONCURRENCY, WEB_THREADS, ...).
+from src.config import Config
+
+bind = f"{Config.HOST}:{Config.PORT}"
+workers = Config.WEB_CONCURRENCY
+threads = Config.WEB_THREADS
+worker_class = "gthread"
+timeout = Config.WEB_TIMEOUT
+# Recycle workers now and then so slow leaks cannot accumulate
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = "-"
+
+
+def on_starting(server):
+    """Create tables and indexes once, in the master, before workers fork"""
+    from src.main import create_app, init_database
+    from src.extensions import db
+
+    app = create_app()
+    init_database(app)
+    with app.app_context():
+        # Do not hand pooled connections opened in the master to forked workers
+        db.engine.dispose()
+
+
+def post_worker_init(worker):
+    """Start in-process job workers when JOB_WORKER_THREADS is set"""
+    if Config.JOB_WORKER_THREADS:
+        from src.services.jobs import start_worker_threads
+        from src.wsgi import app
+
+        worker.job_workers = start_worker_threads(app, Config.JOB_WORKER_THREADS)
+
+
+def worker_exit(server, worker):
+    """Let job workers finish the job in hand; an abandoned lease is reclaimed anyway"""
+    stop = getattr(worker, "job_workers", None)
+    if stop is not None:
+        stop.set()
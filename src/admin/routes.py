@@ -1,57 +1,63 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
+from src.auth.identity import load_identity_user
 from src.models.account import Account
 from src.models.user import User
 from src.extensions import db
+from src.services.stats import marketplace_stats
+from src.utils.export import EXPORT_FORMATS, export_fields, stream_export
+from src.utils.profiling import profile_path, stored_profiles
+from src.utils.query_counter import query_budget
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
 def admin_required():
     """Decorator to check if user is admin"""
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = load_identity_user(get_jwt_identity())
     if not user or not user.is_admin:
         return jsonify({"message": "Admin access required"}), 403
     return None
 
 @admin_bp.route("/dashboard", methods=["GET"])
 @jwt_required()
+@query_budget(4)
 def admin_dashboard():
     admin_check = admin_required()
     if admin_check:
         return admin_check
     
-    # Get dashboard statistics
-    total_accounts = Account.query.count()
-    total_users = User.query.count()
-    
+    # Precomputed counters and breakdowns, see src/services/stats.py
     return jsonify({
         "message": "Welcome to the Admin Dashboard!",
-        "stats": {
-            "total_accounts": total_accounts,
-            "total_users": total_users
-        }
+        "stats": marketplace_stats()
     })
 
 # Product Management (Accounts)
 @admin_bp.route("/accounts", methods=["GET"])
 @jwt_required()
+@query_budget(2)
 def get_all_accounts():
     admin_check = admin_required()
     if admin_check:
         return admin_check
         
-    accounts = Account.query.all()
+    export_format = request.args.get("format")
+    if export_format:
+        return _export(Account, export_format, "accounts")
+    
+    accounts = Account.query.options(joinedload(Account.category)).all()
     return jsonify([account.to_dict() for account in accounts])
 
 @admin_bp.route("/accounts/<int:account_id>", methods=["GET"])
 @jwt_required()
+@query_budget(2)
 def get_account(account_id):
     admin_check = admin_required()
     if admin_check:
         return admin_check
         
-    account = Account.query.get_or_404(account_id)
+    account = Account.query.options(joinedload(Account.category)).get_or_404(account_id)
     return jsonify(account.to_dict())
 
 @admin_bp.route("/accounts", methods=["POST"])
@@ -136,6 +142,42 @@ def get_all_users():
     if admin_check:
         return admin_check
         
+    export_format = request.args.get("format")
+    if export_format:
+        return _export(User, export_format, "users", exclude=("password_hash",))
+    
     users = User.query.all()
     return jsonify([user.to_dict() for user in users])
 
+def _export(model, export_format, filename, exclude=()):
+    """Stream a full table export as NDJSON or CSV, optionally projected with ?fields="""
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"message": f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        fields = export_fields(model, request.args.get("fields"), exclude=exclude)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return stream_export(model, fields, export_format, filename)
+
+# Request profiles recorded with PROFILING_ENABLED, see src/utils/profiling.py
+@admin_bp.route("/profiles", methods=["GET"])
+@jwt_required()
+def get_profiles():
+    admin_check = admin_required()
+    if admin_check:
+        return admin_check
+    
+    return jsonify(stored_profiles())
+
+@admin_bp.route("/profiles/<profile_id>", methods=["GET"])
+@jwt_required()
+def download_profile(profile_id):
+    admin_check = admin_required()
+    if admin_check:
+        return admin_check
+    
+    path = profile_path(profile_id)
+    if not path:
+        return jsonify({"message": "Profile not found"}), 404
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True,
+                     download_name=f"{profile_id}.pstats")
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from src.extensions import db
+from src.models.user import User
+from src.utils.change_tracking import on_commit
+
+# Immutable copy of the user fields auth checks need; safe to share across
+# requests and threads, unlike a session-bound User instance
+IdentityUser = namedtuple('IdentityUser', ['id', 'email', 'username', 'is_admin', 'created_at'])
+
+class IdentityCache:
+    """Thread-safe LRU of user id -> IdentityUser with a per-entry TTL"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidate(); a put() from a load that began before then is dropped
+        self._generation = 0
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user, ttl, generation):
+        """Cache ``user`` unless an invalidation happened since ``generation`` was read"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[user.id] = (user, time.monotonic() + ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, changes):
+        user_ids = changes.get(User)
+        with self._lock:
+            self._generation += 1
+            if user_ids is None:
+                self._entries.clear()
+            else:
+                for user_id in user_ids:
+                    self._entries.pop(user_id, None)
+
+identity_cache = IdentityCache()
+# Drop cached users as soon as their row (e.g. the admin flag) changes
+on_commit((User,), identity_cache.invalidate)
+
+def load_identity_user(identity):
+    """Return the IdentityUser for a JWT identity, or None if the user does not exist.
+
+    Hits are served from memory for IDENTITY_CACHE_TTL seconds; commits that
+    change a user evict it in this process, and the TTL bounds staleness in
+    other worker processes.
+    """
+    try:
+        user_id = int(identity)
+    except (TypeError, ValueError):
+        return None
+    
+    user = identity_cache.get(user_id)
+    if user is not None:
+        return user
+    
+    # Read before the query, so a commit landing while it runs keeps its result out of the cache
+    generation = identity_cache.generation
+    row = db.session.query(
+        User.id, User.email, User.username, User.is_admin, User.created_at
+    ).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    user = IdentityUser(*row)
+    ttl = current_app.config.get('IDENTITY_CACHE_TTL', 0)
+    if ttl:
+        identity_cache.put(user, ttl, generation)
+    return user
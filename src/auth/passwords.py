@@ -0,0 +1,81 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from flask import current_app
+
+class HasherBusy(Exception):
+    """Raised when the password hashing queue is full; answer with 429"""
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated pool with a bounded queue.
+
+    bcrypt releases the GIL, so without a bound every login in flight burns
+    a core and starves the other request threads. Capping concurrent hashes
+    at ``workers`` and rejecting beyond ``max_pending`` keeps a login burst
+    from taking the whole machine. ``workers=0`` hashes inline instead.
+    """
+
+    def __init__(self, workers, max_pending, rounds, wait_seconds):
+        self.workers = workers
+        self.rounds = rounds
+        self.wait_seconds = wait_seconds
+        self._slots = threading.BoundedSemaphore(max(max_pending, workers, 1))
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Created lazily, and again after a fork, since threads do not survive fork()
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='bcrypt')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.wait_seconds)
+        except TimeoutError:
+            raise HasherBusy()
+
+    def hash(self, password):
+        hashed = self._run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    def verify(self, password, password_hash):
+        try:
+            return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+        except ValueError:
+            # Not a bcrypt hash at all
+            return False
+
+    def needs_rehash(self, password_hash):
+        """True when a bcrypt hash was made with a different cost than configured"""
+        parts = password_hash.split('$')
+        return len(parts) < 4 or not parts[2].isdigit() or int(parts[2]) != self.rounds
+
+def init_app(app):
+    workers = app.config.get('BCRYPT_WORKERS')
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 2) // 2)
+    app.extensions['password_hasher'] = PasswordHasher(
+        workers=workers,
+        max_pending=app.config.get('BCRYPT_MAX_PENDING') or workers * 4,
+        rounds=app.config['BCRYPT_ROUNDS'],
+        wait_seconds=app.config['BCRYPT_WAIT_SECONDS']
+    )
+
+def password_hasher():
+    return current_app.extensions['password_hasher']
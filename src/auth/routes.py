@@ -1,13 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-import bcrypt
 from src.extensions import db
 from src.models.user import User
+from src.auth.identity import load_identity_user
+from src.auth.passwords import HasherBusy, password_hasher
+from src.utils.rate_limit import by_ip, rate_limit
 from datetime import timedelta
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
+@auth_bp.errorhandler(HasherBusy)
+def hasher_busy(e):
+    return jsonify({"message": "Too many authentication requests, please retry shortly"}), 429, {"Retry-After": "1"}
+
 @auth_bp.route("/register", methods=["POST"])
+@rate_limit("auth.register", "5/minute", key=by_ip)
 def register():
     data = request.get_json()
     
@@ -19,13 +26,13 @@ def register():
     if User.query.filter_by(email=data["email"]).first():
         return jsonify({"message": "User already exists"}), 409
     
-    # Hash password
-    password_hash = bcrypt.hashpw(data["password"].encode('utf-8'), bcrypt.gensalt())
+    # Hash password (off the request thread, see src/auth/passwords.py)
+    password_hash = password_hasher().hash(data["password"])
     
     # Create new user
     new_user = User(
         email=data["email"],
-        password_hash=password_hash.decode('utf-8'),
+        password_hash=password_hash,
         username=data.get("username", data["email"].split("@")[0]),
         is_admin=data.get("is_admin", False)
     )
@@ -36,7 +43,7 @@ def register():
         
         # Create access token
         access_token = create_access_token(
-            identity=new_user.id,
+            identity=str(new_user.id),
             expires_delta=timedelta(days=7)
         )
         
@@ -56,6 +63,7 @@ def register():
         return jsonify({"message": "Failed to create user"}), 500
 
 @auth_bp.route("/login", methods=["POST"])
+@rate_limit("auth.login", "10/minute burst 5", key=by_ip)
 def login():
     data = request.get_json()
     
@@ -65,12 +73,21 @@ def login():
     # Find user
     user = User.query.filter_by(email=data["email"]).first()
     
-    if not user or not bcrypt.checkpw(data["password"].encode('utf-8'), user.password_hash.encode('utf-8')):
+    hasher = password_hasher()
+    if not user or not hasher.verify(data["password"], user.password_hash):
         return jsonify({"message": "Invalid credentials"}), 401
     
+    # Upgrade hashes made with an older cost factor while we know the password
+    if hasher.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hasher.hash(data["password"])
+            db.session.commit()
+        except HasherBusy:
+            pass
+    
     # Create access token
     access_token = create_access_token(
-        identity=user.id,
+        identity=str(user.id),
         expires_delta=timedelta(days=7)
     )
     
@@ -88,8 +105,7 @@ def login():
 @auth_bp.route("/profile", methods=["GET"])
 @jwt_required()
 def get_profile():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = load_identity_user(get_jwt_identity())
     
     if not user:
         return jsonify({"message": "User not found"}), 404
@@ -107,8 +123,7 @@ def get_profile():
 @auth_bp.route("/admin-check", methods=["GET"])
 @jwt_required()
 def admin_check():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = load_identity_user(get_jwt_identity())
     
     if not user:
         return jsonify({"message": "User not found"}), 404
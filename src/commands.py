@@ -0,0 +1,75 @@
+import click
+from src.models.job import Job
+from src.services.jobs import retry_dead, work
+from src.services.outbox import prune_events
+from src.services.query_plans import check_listing_plans, create_missing_indexes
+from src.services.search import rebuild_search_index
+from src.services.stats import reconcile_stats
+
+def init_app(app):
+    """Register the maintenance commands with ``flask --app src.main``"""
+
+    @app.cli.command('search-rebuild')
+    def search_rebuild():
+        """Create the account search index and re-index all accounts."""
+        if rebuild_search_index():
+            click.echo('Search index rebuilt.')
+        else:
+            click.echo('This database backend has no search index; falling back to substring search.')
+
+    @app.cli.command('explain-listings')
+    @click.option('--create-indexes', is_flag=True, help='Create declared indexes missing from the database first.')
+    def explain_listings(create_indexes):
+        """Show the query plans of the listing queries and flag full table scans."""
+        if create_indexes:
+            create_missing_indexes()
+        
+        failures = 0
+        for name, plan, full_scans in check_listing_plans():
+            click.echo(f'{"FULL SCAN" if full_scans else "ok":>9}  {name}')
+            for line in plan:
+                click.echo(f'           {line}')
+            failures += bool(full_scans)
+        
+        if failures:
+            raise click.ClickException(f'{failures} listing queries scan a whole table')
+
+    @app.cli.command('stats-reconcile')
+    @click.option('--skip-listings', is_flag=True, help='Leave the total_sales and success_rate columns of accounts alone.')
+    def stats_reconcile(skip_listings):
+        """Recompute the materialized statistics from orders, accounts and users.
+
+        Run periodically (e.g. from cron) to correct drift from bulk writes.
+        """
+        drift = reconcile_stats(listings=not skip_listings)
+        click.echo(', '.join(f'{table}: {rows} rows corrected' for table, rows in drift.items()))
+
+    @app.cli.command('jobs-work')
+    @click.option('--once', is_flag=True, help='Exit once no job is due instead of polling.')
+    def jobs_work(once):
+        """Run a background job worker (order processing and other queued jobs)."""
+        outcomes = work(once=once)
+        click.echo(', '.join(f'{outcome}: {count}' for outcome, count in outcomes.items()))
+
+    @app.cli.command('jobs-dead')
+    @click.option('--limit', default=50, show_default=True)
+    def jobs_dead(limit):
+        """List jobs that exhausted their attempts."""
+        for job in Job.query.filter_by(status='dead').order_by(Job.finished_at.desc()).limit(limit):
+            click.echo(f'{job.id:>8}  {job.kind}  attempts={job.attempts}  {job.payload}  {job.last_error}')
+
+    @app.cli.command('jobs-retry')
+    @click.argument('job_ids', nargs=-1, type=int)
+    def jobs_retry(job_ids):
+        """Queue dead jobs again (all of them unless JOB_IDS are given)."""
+        click.echo(f'{retry_dead(list(job_ids))} jobs queued again.')
+
+    @app.cli.command('outbox-prune')
+    @click.option('--days', type=int, help='Keep this many days of events (default OUTBOX_RETENTION_DAYS).')
+    def outbox_prune(days):
+        """Delete old change events; subscribers further behind are told to reload.
+
+        Run periodically (e.g. from cron).
+        """
+        days = app.config['OUTBOX_RETENTION_DAYS'] if days is None else days
+        click.echo(f'{prune_events(days)} events pruned.')
@@ -0,0 +1,148 @@
+import os
+import tempfile
+
+def _env_bool(name, default=False):
+    return os.environ.get(name, '1' if default else '0').lower() in ('1', 'true', 'yes', 'on')
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+def _env_optional_int(name, default):
+    # Set but empty means "not configured": None, so the setting is skipped
+    value = os.environ.get(name, default)
+    return None if value in (None, '') else int(value)
+
+def _env_limits(name):
+    # "auth.login=5/minute;catalogue=300/minute burst 60" -> {"auth.login": "5/minute", ...}
+    pairs = (item.split('=', 1) for item in os.environ.get(name, '').split(';') if '=' in item)
+    return {key.strip(): value.strip() for key, value in pairs}
+
+def _database_uri():
+    uri = os.environ.get('DATABASE_URL')
+    if not uri:
+        return f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    # Render and Heroku hand out the scheme SQLAlchemy 1.4+ no longer accepts
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def engine_options(uri, config):
+    """SQLAlchemy engine options for ``uri``; in-memory SQLite has no sizable pool"""
+    if uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') in ('sqlite:', 'sqlite:/')):
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+
+class Config:
+    """Application settings, overridable through environment variables"""
+    DEBUG = _env_bool('FLASK_DEBUG')
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-string-change-in-production')
+    
+    SQLALCHEMY_DATABASE_URI = _database_uri()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # One pool per worker process: size it to the worker's thread count
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 5)
+    DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 30)
+    DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)
+    DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
+    
+    # Read replicas for catalogue browsing (see src/utils/db_routing.py), and how
+    # long a client keeps reading from the primary after it wrote something
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+    READ_YOUR_WRITES_SECONDS = _env_int('READ_YOUR_WRITES_SECONDS', 5)
+    
+    # SQLite connection pragmas (see src/utils/sqlite_pragmas.py); set one to an
+    # empty string to keep SQLite's default. WAL lets readers run alongside a
+    # writer, and the busy timeout makes writers queue instead of failing with
+    # "database is locked".
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = _env_optional_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    SQLITE_CACHE_SIZE_KB = _env_optional_int('SQLITE_CACHE_SIZE_KB', 65536)
+    SQLITE_MMAP_SIZE = _env_optional_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    
+    # Raise when a view exceeds its declared query budget (see src/utils/query_counter.py)
+    ASSERT_QUERY_BUDGET = _env_bool('ASSERT_QUERY_BUDGET')
+    # Upper bound on how stale a cached /api/accounts/by-category payload can be
+    # in a worker that did not see the invalidating commit
+    HOMEPAGE_SNAPSHOT_TTL = _env_int('HOMEPAGE_SNAPSHOT_TTL', 60)
+    # Same bound for cached /api/accounts/facets counts
+    FACET_CACHE_TTL = _env_int('FACET_CACHE_TTL', 60)
+    # ... and for the cached category tree (see src/services/category_tree.py)
+    CATEGORY_TREE_TTL = _env_int('CATEGORY_TREE_TTL', 60)
+    
+    # Seconds a JWT identity -> user lookup is served from memory (0 disables)
+    IDENTITY_CACHE_TTL = _env_int('IDENTITY_CACHE_TTL', 30)
+    
+    # Password hashing (see src/auth/passwords.py). BCRYPT_WORKERS defaults to
+    # half the CPUs; logins beyond BCRYPT_MAX_PENDING in flight get a 429.
+    BCRYPT_ROUNDS = _env_int('BCRYPT_ROUNDS', 12)
+    BCRYPT_WORKERS = int(os.environ['BCRYPT_WORKERS']) if os.environ.get('BCRYPT_WORKERS') else None
+    BCRYPT_MAX_PENDING = int(os.environ['BCRYPT_MAX_PENDING']) if os.environ.get('BCRYPT_MAX_PENDING') else None
+    BCRYPT_WAIT_SECONDS = _env_int('BCRYPT_WAIT_SECONDS', 10)
+    
+    # Token-bucket rate limits (see src/utils/rate_limit.py). RATE_LIMITS overrides
+    # the per-endpoint defaults by bucket name; point RATE_LIMIT_STORAGE_URL at
+    # redis:// to share buckets between worker processes.
+    RATE_LIMIT_ENABLED = _env_bool('RATE_LIMIT_ENABLED', True)
+    RATE_LIMIT_STORAGE_URL = os.environ.get('RATE_LIMIT_STORAGE_URL', 'memory://')
+    RATE_LIMITS = _env_limits('RATE_LIMITS')
+    # Number of reverse proxies in front of the app whose X-Forwarded-For is
+    # trusted for the client IP (Render runs one)
+    PROXY_FIX_X_FOR = _env_int('PROXY_FIX_X_FOR', 0)
+    
+    # Background job queue (see src/services/jobs.py). JOB_WORKER_THREADS runs
+    # workers inside each web process; otherwise run `flask jobs-work`.
+    JOB_WORKER_THREADS = _env_int('JOB_WORKER_THREADS', 0)
+    JOB_BATCH_SIZE = _env_int('JOB_BATCH_SIZE', 10)
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1))
+    JOB_LEASE_SECONDS = _env_int('JOB_LEASE_SECONDS', 60)
+    JOB_MAX_ATTEMPTS = _env_int('JOB_MAX_ATTEMPTS', 5)
+    JOB_BACKOFF_SECONDS = _env_int('JOB_BACKOFF_SECONDS', 2)
+    JOB_BACKOFF_MAX_SECONDS = _env_int('JOB_BACKOFF_MAX_SECONDS', 300)
+    
+    # Change events (see src/services/outbox.py and GET /api/events). Every open
+    # stream holds a web thread, so EVENT_STREAM_MAX_CONNECTIONS caps them per
+    # process; streams close after EVENT_STREAM_MAX_SECONDS and clients resume.
+    OUTBOX_RETENTION_DAYS = _env_int('OUTBOX_RETENTION_DAYS', 7)
+    # PostgreSQL only: how long a transaction may take to commit after writing an event
+    OUTBOX_SETTLE_SECONDS = _env_int('OUTBOX_SETTLE_SECONDS', 2)
+    EVENT_STREAM_MAX_CONNECTIONS = _env_int('EVENT_STREAM_MAX_CONNECTIONS', 4)
+    EVENT_STREAM_MAX_SECONDS = _env_int('EVENT_STREAM_MAX_SECONDS', 300)
+    EVENT_STREAM_BATCH_SIZE = _env_int('EVENT_STREAM_BATCH_SIZE', 100)
+    EVENT_STREAM_POLL_INTERVAL = float(os.environ.get('EVENT_STREAM_POLL_INTERVAL', 1))
+    EVENT_STREAM_KEEPALIVE_SECONDS = _env_int('EVENT_STREAM_KEEPALIVE_SECONDS', 15)
+    EVENT_STREAM_RETRY_MS = _env_int('EVENT_STREAM_RETRY_MS', 3000)
+    
+    # Request and SQL metrics at GET /metrics (see src/utils/metrics.py). Set
+    # METRICS_TOKEN to require "Authorization: Bearer <token>" from the scraper.
+    METRICS_ENABLED = _env_bool('METRICS_ENABLED', True)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Statements slower than this are logged to src.slow_queries (0 disables)
+    SLOW_QUERY_MS = _env_int('SLOW_QUERY_MS', 250)
+    
+    # Per-request profiling for admins (see src/utils/profiling.py); off by default
+    PROFILING_ENABLED = _env_bool('PROFILING_ENABLED')
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'accsmarket-profiles'))
+    PROFILE_KEEP = _env_int('PROFILE_KEEP', 50)
+    PROFILE_TOP_FUNCTIONS = _env_int('PROFILE_TOP_FUNCTIONS', 40)
+    
+    # Response compression (see src/utils/http_caching.py): bodies smaller than
+    # COMPRESSION_MIN_SIZE bytes are sent as-is
+    COMPRESSION_MIN_SIZE = _env_int('COMPRESSION_MIN_SIZE', 1024)
+    COMPRESSION_LEVEL = _env_int('COMPRESSION_LEVEL', 6)
+    
+    # Production server (read by gunicorn.conf.py)
+    HOST = os.environ.get('HOST', '0.0.0.0')
+    PORT = _env_int('PORT', 5000)
+    WEB_CONCURRENCY = _env_int('WEB_CONCURRENCY', 2)
+    WEB_THREADS = _env_int('WEB_THREADS', 8)
+    WEB_TIMEOUT = _env_int('WEB_TIMEOUT', 30)
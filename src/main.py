@@ -5,32 +5,58 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+from src.config import Config, engine_options
 from src.extensions import db, jwt
+from src import commands
+from src.utils import db_routing, http_caching, metrics, profiling, rate_limit, sqlite_pragmas
+from src.services.query_plans import create_missing_indexes
+from src.services.jobs import start_worker_threads
+from src.services.search import ensure_search_index
+from src.services.stats import ensure_stats
 from src.routes.user import user_bp
 from src.routes.account import account_bp
+from src.routes.order import order_bp
 from src.routes.seed_data import seed_bp
+from src.routes.events import events_bp
 from src.admin.routes import admin_bp
 from src.auth.routes import auth_bp
+from src.auth import passwords
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
-    app.config["SECRET_KEY"] = "asdf#FGSgvasgf$5$WGT"
-    app.config["JWT_SECRET_KEY"] = "jwt-secret-string-change-in-production"
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config["SQLALCHEMY_DATABASE_URI"], app.config))
+    if app.config["PROXY_FIX_X_FOR"]:
+        # Rate limits key on the client IP, not the proxy's
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"])
 
     # Initialize extensions
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db_routing.init_app(app, lambda uri: engine_options(uri, app.config))
     db.init_app(app)
+    sqlite_pragmas.init_app(app)
+    metrics.init_app(app)
     jwt.init_app(app)
+    passwords.init_app(app)
+    rate_limit.init_app(app)
+    commands.init_app(app)
 
     # Register blueprints
     app.register_blueprint(user_bp, url_prefix="/api/user")
     app.register_blueprint(account_bp, url_prefix="/api")
+    app.register_blueprint(order_bp, url_prefix="/api")
     app.register_blueprint(seed_bp, url_prefix="/api")
+    app.register_blueprint(events_bp, url_prefix="/api")
     app.register_blueprint(admin_bp, url_prefix="/api/admin")
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
 
-    CORS(app)
+    # Let cross-origin clients read the read-your-writes marker they must echo
+    CORS(app, expose_headers=[db_routing.PRIMARY_HEADER])
+    http_caching.init_app(app)
+    # Last, so its report passes through CORS and compression (see its init_app)
+    profiling.init_app(app)
 
     @app.route("/")
     def health_check():
@@ -49,16 +75,27 @@ def create_app():
                 "accounts": "/api/accounts",
                 "categories": "/api/categories",
                 "accounts_by_category": "/api/accounts/by-category",
+                "account_facets": "/api/accounts/facets",
+                "orders": "/api/orders",
+                "events": "/api/events",
                 "seed_data": "/api/seed-data"
             }
         })
 
     return app
 
-if __name__ == "__main__":
-    app = create_app()
+def init_database(app):
+    """Create missing tables, indexes, the search index and the statistics"""
     with app.app_context():
         db.create_all()
-    app.run(host="0.0.0.0", port=5000, debug=True)
-
+        create_missing_indexes()
+        ensure_search_index()
+        ensure_stats()
 
+if __name__ == "__main__":
+    # Development server only; production runs gunicorn with src.wsgi:app
+    app = create_app()
+    init_database(app)
+    if app.config["JOB_WORKER_THREADS"]:
+        start_worker_threads(app, app.config["JOB_WORKER_THREADS"])
+    app.run(host=app.config["HOST"], port=app.config["PORT"], debug=app.config["DEBUG"])
@@ -100,15 +100,27 @@ class Account(db.Model):
             'category': self.category.to_dict() if self.category else None
         }
 
+# Indexes matching the catalogue access paths: every listing filters on status
+# and orders by (is_featured, created_at, id), optionally narrowed by category,
+# platform (compared lowercased) or price.
+db.Index('ix_account_listing', Account.status, Account.is_featured, Account.created_at, Account.id)
+db.Index('ix_account_category_listing', Account.category_id, Account.status, Account.is_featured, Account.created_at, Account.id)
+db.Index('ix_account_platform_listing', db.func.lower(Account.platform), Account.status, Account.is_featured, Account.created_at)
+db.Index('ix_account_status_price', Account.status, Account.price)
+# max(updated_at) validates conditional GETs of the listings
+db.Index('ix_account_updated_at', Account.updated_at)
+
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     buyer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    seller_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False)
-    quantity = db.Column(db.Integer, nullable=False)
+    # active_history: assigning one of these loads the previous value first, so the
+    # statistics hooks can subtract an order's old figures even after it was expired
+    seller_id = db.column_property(db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False), active_history=True)
+    account_id = db.column_property(db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False), active_history=True)
+    quantity = db.column_property(db.Column(db.Integer, nullable=False), active_history=True)
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
-    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
-    status = db.Column(db.String(20), default='pending')
+    total_amount = db.column_property(db.Column(db.Numeric(10, 2), nullable=False), active_history=True)
+    status = db.column_property(db.Column(db.String(20), default='pending'), active_history=True)
     payment_method = db.Column(db.String(50))
     transaction_id = db.Column(db.String(100))
     delivery_details = db.Column(db.Text)
@@ -140,3 +152,52 @@ class Order(db.Model):
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
 
+class OrderIdempotencyKey(db.Model):
+    """Client-supplied Idempotency-Key of a placed order, unique per buyer"""
+    __table_args__ = (db.UniqueConstraint('buyer_id', 'key', name='uq_order_idempotency_key'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    buyer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    order = db.relationship('Order')
+    
+    def __repr__(self):
+        return f'<OrderIdempotencyKey {self.key}>'
+
+class InventoryItem(db.Model):
+    """One deliverable unit (e.g. a set of credentials) of a listing.
+
+    ``order_id`` is set when an order claims the unit. The listing's
+    ``stock_quantity`` is kept in step as a counter (see src/services/inventory.py).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'))
+    claimed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    account = db.relationship('Account', backref=db.backref('inventory_items', lazy='dynamic'))
+    order = db.relationship('Order', backref='items')
+    
+    def __repr__(self):
+        return f'<InventoryItem {self.id}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'account_id': self.account_id,
+            'payload': self.payload,
+            'order_id': self.order_id,
+            'claimed_at': self.claimed_at.isoformat() if self.claimed_at else None
+        }
+
+# Claims take the lowest unclaimed ids of a listing; the partial index holds only unclaimed units
+db.Index('ix_inventory_item_unclaimed', InventoryItem.account_id, InventoryItem.id,
+         sqlite_where=InventoryItem.order_id.is_(None), postgresql_where=InventoryItem.order_id.is_(None))
+db.Index('ix_inventory_item_order', InventoryItem.order_id)
+# Whether, and since when, a listing has units (see hand_delivered())
+db.Index('ix_inventory_item_account_created', InventoryItem.account_id, InventoryItem.created_at)
@@ -0,0 +1,43 @@
+from datetime import datetime
+from src.models.user import db
+
+class Job(db.Model):
+    """A unit of background work in the database-backed queue (see src/services/jobs.py).
+
+    ``status`` moves queued -> running -> done, back to queued with a later
+    ``run_at`` when an attempt fails, or to dead once ``max_attempts`` are used.
+    A running job whose ``locked_until`` has passed belongs to a crashed worker
+    and is claimed again.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+# Workers poll for due jobs in run_at order
+db.Index('ix_job_status_run_at', Job.status, Job.run_at)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from src.models.user import db
+
+class OutboxEvent(db.Model):
+    """A change to an Account, Order or Category, written in the transaction that made it.
+
+    ``id`` increases with every event and is the SSE event id subscribers
+    resume from (see src/services/outbox.py). On SQLite the table is declared
+    AUTOINCREMENT, so ids are never reused after the newest events are pruned.
+    """
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(20), nullable=False)
+    action = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.topic}.{self.action}>'
+
+# Pruning deletes by age
+db.Index('ix_outbox_event_created_at', OutboxEvent.created_at)
@@ -0,0 +1,66 @@
+from datetime import datetime
+from src.models.user import db
+
+# Precomputed marketplace statistics, kept current by src/services/stats.py.
+# Money is stored in integer cents so repeated increments stay exact.
+
+class StatCounter(db.Model):
+    """Marketplace-wide counter, e.g. ``accounts`` or ``revenue_cents``"""
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatCounter {self.name}={self.value}>'
+
+class SellerStats(db.Model):
+    """Listing and sales aggregates of one seller"""
+    seller_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    listings = db.Column(db.Integer, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    completed_orders = db.Column(db.Integer, nullable=False, default=0)
+    failed_orders = db.Column(db.Integer, nullable=False, default=0)
+    units_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def success_rate(self):
+        """Percentage of finished orders that completed"""
+        finished = self.completed_orders + self.failed_orders
+        return round(100.0 * self.completed_orders / finished, 2) if finished else 0.0
+
+    def __repr__(self):
+        return f'<SellerStats {self.seller_id}>'
+
+    def to_dict(self):
+        return {
+            'seller_id': self.seller_id,
+            'listings': self.listings,
+            'orders': self.orders,
+            'completed_orders': self.completed_orders,
+            'failed_orders': self.failed_orders,
+            'units_sold': self.units_sold,
+            'revenue': self.revenue_cents / 100,
+            'success_rate': self.success_rate
+        }
+
+class SalesBreakdown(db.Model):
+    """Order aggregates per value of a listing dimension (``platform`` or ``category``)"""
+    dimension = db.Column(db.String(20), primary_key=True)
+    key = db.Column(db.String(100), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    completed_orders = db.Column(db.Integer, nullable=False, default=0)
+    units_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue_cents = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SalesBreakdown {self.dimension}={self.key}>'
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'orders': self.orders,
+            'completed_orders': self.completed_orders,
+            'units_sold': self.units_sold,
+            'revenue': self.revenue_cents / 100
+        }
@@ -1,44 +1,117 @@
-from flask import Blueprint, request, jsonify
+import base64
+import json
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import db
+from src.auth.identity import load_identity_user
 from src.models.account import Account, Category
+from src.services.account_serializer import account_schema, encode_json, parse_fields
+from src.services.bulk_import import import_accounts, parse_csv, parse_ndjson
+from src.services.category_tree import category_tree
+from src.services.facets import facet_counts
+from src.services.inventory import MAX_ITEMS_PER_UPLOAD, add_inventory
+from src.services.listings import (
+    filter_listings, listing_filters, listing_order, listing_validators, top_listings_per_category
+)
+from src.utils.change_tracking import on_commit
+from src.utils.db_routing import read_replica
+from src.utils.http_caching import conditional
+from src.utils.rate_limit import rate_limit
+from src.utils.query_counter import query_budget
+from src.utils.snapshot import SnapshotCache
 from sqlalchemy import or_, and_
+from sqlalchemy.orm import joinedload
 
 account_bp = Blueprint('account', __name__)
 
+# Upper bound for the per_category parameter of /accounts/by-category
+MAX_PER_CATEGORY = 50
+# Upper bound for the per_page parameter of /accounts
+MAX_PER_PAGE = 100
+# Per-client budget shared by the catalogue reads; see src/utils/rate_limit.py
+CATALOGUE_LIMIT = '300/minute burst 60'
+
+# Snapshots are shared by every client, so the views building them read the
+# primary: a build from a lagging replica right after an invalidating commit
+# would be served until the TTL, even to clients pinned to the primary
+
+# Encoded /accounts/by-category payloads, rebuilt after any Account/Category commit
+homepage_snapshots = SnapshotCache()
+on_commit((Account, Category), homepage_snapshots.invalidate)
+# Encoded /accounts/facets payloads per filter signature, dropped the same way
+facet_snapshots = SnapshotCache(maxsize=1024)
+on_commit((Account, Category), facet_snapshots.invalidate)
+
+def _encode_cursor(is_featured, created_at, account_id):
+    """Encode the keyset position of an account as an opaque cursor"""
+    payload = [
+        bool(is_featured),
+        created_at.isoformat() if created_at else None,
+        account_id
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor):
+    """Decode a cursor produced by _encode_cursor into (is_featured, created_at, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        is_featured, created_at, account_id = json.loads(raw)
+        return bool(is_featured), datetime.fromisoformat(created_at), int(account_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def _after_cursor(is_featured, created_at, account_id):
+    """Filter selecting rows that sort after the cursor position"""
+    same_flag = and_(
+        Account.is_featured.is_(is_featured),
+        or_(
+            Account.created_at < created_at,
+            and_(Account.created_at == created_at, Account.id < account_id)
+        )
+    )
+    if is_featured:
+        # Featured rows sort first, so every non-featured row comes after
+        return or_(Account.is_featured.is_(False), same_flag)
+    return same_flag
+
 @account_bp.route('/accounts', methods=['GET'])
+@rate_limit('catalogue', CATALOGUE_LIMIT)
+@read_replica
+@conditional(listing_validators)
+# Two statements, plus one when a category filter misses the category tree cache
+@query_budget(3)
 def get_accounts():
-    """Get all accounts with optional filtering"""
+    """Get all accounts with optional filtering.
+
+    Supports two pagination modes: the classic ``page``/``per_page`` offset
+    mode, and a keyset mode enabled by passing ``cursor`` (empty for the first
+    page). Keyset mode returns ``next_cursor`` and only computes ``total`` when
+    ``include_total=true`` is passed. ``fields=id,title,price`` restricts each
+    account to the listed fields. ``category_id`` also matches listings in
+    its subcategories. ``per_page`` is capped at ``MAX_PER_PAGE``.
+    """
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
-        platform = request.args.get('platform')
-        category_id = request.args.get('category_id', type=int)
-        search = request.args.get('search')
-        min_price = request.args.get('min_price', type=float)
-        max_price = request.args.get('max_price', type=float)
+        per_page = min(max(per_page, 1), MAX_PER_PAGE)
+        cursor = request.args.get('cursor')
+        try:
+            schema = account_schema(parse_fields(request.args.get('fields')))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        query = Account.query.filter_by(status='active')
+        query, search_rank = filter_listings(Account.query, **listing_filters(request.args))
+        # Select plain column tuples rather than hydrating Account objects
+        query = schema.select(query)
         
-        if platform:
-            query = query.filter(Account.platform.ilike(f'%{platform}%'))
+        if cursor is not None:
+            # Keyset pages always use the plain listing order the cursor encodes
+            return _get_accounts_page_by_cursor(query.order_by(*listing_order()), schema, cursor, per_page)
         
-        if category_id:
-            query = query.filter_by(category_id=category_id)
-        
-        if search:
-            query = query.filter(or_(
-                Account.title.ilike(f'%{search}%'),
-                Account.description.ilike(f'%{search}%')
-            ))
-        
-        if min_price is not None:
-            query = query.filter(Account.price >= min_price)
-        
-        if max_price is not None:
-            query = query.filter(Account.price <= max_price)
-        
-        # Order by featured first, then by created date
-        query = query.order_by(Account.is_featured.desc(), Account.created_at.desc())
+        # Offset pages also rank search matches by relevance within the featured groups
+        query = query.order_by(*listing_order(search_rank))
         
         accounts = query.paginate(
             page=page, 
@@ -46,8 +119,8 @@ def get_accounts():
             error_out=False
         )
         
-        return jsonify({
-            'accounts': [account.to_dict() for account in accounts.items],
+        return _json_response({
+            'accounts': schema.to_dicts(accounts.items),
             'total': accounts.total,
             'pages': accounts.pages,
             'current_page': page,
@@ -57,11 +130,43 @@ def get_accounts():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _json_response(payload):
+    # Trailing newline as jsonify() writes it, so the bytes match the earlier responses
+    return current_app.response_class(encode_json(payload) + b'\n', mimetype='application/json')
+
+def _get_accounts_page_by_cursor(query, schema, cursor, per_page):
+    """Serve one keyset page of an already filtered and ordered accounts query"""
+    include_total = request.args.get('include_total', 'false').lower() == 'true'
+    total = query.order_by(None).count() if include_total else None
+    
+    if cursor:
+        try:
+            query = query.filter(_after_cursor(*_decode_cursor(cursor)))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    
+    response = {
+        'accounts': schema.to_dicts(rows),
+        'next_cursor': _encode_cursor(*schema.cursor_position(rows[-1])) if has_more else None,
+        'per_page': per_page
+    }
+    if include_total:
+        response['total'] = total
+    return _json_response(response)
+
 @account_bp.route('/accounts/<int:account_id>', methods=['GET'])
+@rate_limit('catalogue', CATALOGUE_LIMIT)
+@read_replica
+@query_budget(1)
 def get_account(account_id):
     """Get a specific account by ID"""
     try:
-        account = Account.query.get_or_404(account_id)
+        account = Account.query.options(joinedload(Account.category)).get_or_404(account_id)
         return jsonify(account.to_dict())
     
     except Exception as e:
@@ -104,12 +209,93 @@ def create_account():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@account_bp.route('/accounts/import', methods=['POST'])
+@jwt_required()
+@rate_limit('accounts.import', '20/hour burst 5')
+def import_account_listings():
+    """Bulk-create listings for the current seller from a streamed CSV or NDJSON body.
+
+    The body is read and inserted incrementally in batches. Invalid rows are
+    reported by line number without aborting the rest of the import.
+    """
+    try:
+        content_type = request.mimetype
+        if content_type in ('text/csv', 'application/csv'):
+            rows = parse_csv(request.stream)
+        elif content_type in ('application/x-ndjson', 'application/jsonl', 'application/ndjson'):
+            rows = parse_ndjson(request.stream)
+        else:
+            return jsonify({'error': 'Send text/csv or application/x-ndjson'}), 415
+        
+        report = import_accounts(rows, seller_id=int(get_jwt_identity()))
+        return jsonify(report.to_dict())
+    
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'Body must be UTF-8 encoded'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@account_bp.route('/accounts/<int:account_id>/inventory', methods=['POST'])
+@jwt_required()
+def add_account_inventory(account_id):
+    """Add deliverable units to a listing: ``{"items": ["login:password", ...]}``.
+
+    Only the listing's seller or an admin may add units; stock rises by the
+    number of units added.
+    """
+    try:
+        account = db.session.get(Account, account_id)
+        if not account:
+            return jsonify({'error': 'Account not found'}), 404
+        
+        user = load_identity_user(get_jwt_identity())
+        if not user or (user.id != account.seller_id and not user.is_admin):
+            return jsonify({'error': 'Only the seller can add inventory'}), 403
+        
+        items = (request.get_json(silent=True) or {}).get('items')
+        if not isinstance(items, list) or not items or not all(isinstance(item, str) and item.strip() for item in items):
+            return jsonify({'error': 'items must be a non-empty list of strings'}), 400
+        if len(items) > MAX_ITEMS_PER_UPLOAD:
+            return jsonify({'error': f'At most {MAX_ITEMS_PER_UPLOAD} items per request'}), 400
+        
+        added = add_inventory(account_id, items)
+        db.session.commit()
+        
+        db.session.refresh(account, ['stock_quantity'])
+        return jsonify({'added': added, 'stock_quantity': account.stock_quantity}), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @account_bp.route('/categories', methods=['GET'])
+@rate_limit('catalogue', CATALOGUE_LIMIT)
 def get_categories():
-    """Get all categories"""
+    """Get all active categories, served from the cached category tree"""
+    try:
+        return jsonify(category_tree().active())
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@account_bp.route('/categories/<int:category_id>', methods=['GET'])
+@rate_limit('catalogue', CATALOGUE_LIMIT)
+def get_category(category_id):
+    """Get a category with its breadcrumbs, subcategories and descendant ids"""
     try:
-        categories = Category.query.filter_by(is_active=True).all()
-        return jsonify([category.to_dict() for category in categories])
+        tree = category_tree()
+        category = tree.get(category_id)
+        if category is None:
+            return jsonify({'error': 'Category not found'}), 404
+        
+        return jsonify({
+            **category,
+            'breadcrumbs': tree.breadcrumbs(category_id),
+            'subcategories': tree.children(category_id),
+            'descendant_ids': sorted(tree.descendant_ids(category_id))
+        })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -136,32 +322,92 @@ def create_category():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@account_bp.route('/accounts/facets', methods=['GET'])
+@rate_limit('catalogue', CATALOGUE_LIMIT)
+@query_budget(2)
+def get_account_facets():
+    """Count listings per platform, country, account type, verification status and price bucket.
+
+    Takes the same filters as ``GET /accounts`` and computes every facet in a
+    single grouped scan. Payloads are cached per filter signature until an
+    Account or Category commit (or ``FACET_CACHE_TTL`` seconds pass).
+    """
+    try:
+        filters = listing_filters(request.args)
+        if filters['platform']:
+            filters['platform'] = filters['platform'].lower()
+        signature = tuple(sorted((name, value) for name, value in filters.items() if value not in (None, '')))
+        
+        snapshot = facet_snapshots.get(
+            signature,
+            lambda: _encode_json(facet_counts(**filters)),
+            ttl=current_app.config.get('FACET_CACHE_TTL')
+        )
+        response = current_app.response_class(snapshot.body, mimetype='application/json')
+        response.set_etag(snapshot.etag)
+        return response.make_conditional(request)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @account_bp.route('/accounts/by-category', methods=['GET'])
+@rate_limit('catalogue', CATALOGUE_LIMIT)
+@query_budget(2)
 def get_accounts_by_category():
-    """Get accounts grouped by category and subcategory"""
+    """Get accounts grouped by category and subcategory.
+
+    ``per_category`` (default 5) caps the accounts returned per subcategory.
+    The encoded payload is cached until an Account or Category commit (or
+    ``HOMEPAGE_SNAPSHOT_TTL`` seconds pass) and served with an ETag.
+    """
     try:
-        # Get all main categories
-        main_categories = Category.query.filter_by(parent_id=None, is_active=True).all()
-        result = {}
-        
-        for main_category in main_categories:
-            result[main_category.name] = {}
-            
-            # Get subcategories
-            subcategories = Category.query.filter_by(parent_id=main_category.id, is_active=True).all()
-            
-            for subcategory in subcategories:
-                # Get accounts for this subcategory (limit to 5 for homepage display)
-                accounts = Account.query.filter_by(
-                    category_id=subcategory.id, 
-                    status='active'
-                ).order_by(Account.is_featured.desc(), Account.created_at.desc()).limit(5).all()
-                
-                if accounts:  # Only include subcategories that have accounts
-                    result[main_category.name][subcategory.name] = [account.to_dict() for account in accounts]
-        
-        return jsonify(result)
+        per_category = request.args.get('per_category', 5, type=int)
+        per_category = min(max(per_category, 1), MAX_PER_CATEGORY)
+        
+        snapshot = homepage_snapshots.get(
+            per_category,
+            lambda: _encode_json(_group_accounts_by_category(per_category)),
+            ttl=current_app.config.get('HOMEPAGE_SNAPSHOT_TTL')
+        )
+        response = current_app.response_class(snapshot.body, mimetype='application/json')
+        response.set_etag(snapshot.etag)
+        return response.make_conditional(request)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _encode_json(payload):
+    """Encode a payload exactly as jsonify() would"""
+    return f'{current_app.json.dumps(payload)}\n'.encode('utf-8')
+
+def _group_accounts_by_category(per_category):
+    """Build the {main category: {subcategory: [accounts]}} homepage payload.
+
+    All subcategories are filled from a single ``ROW_NUMBER()`` window query.
+    """
+    # Load the whole active category tree in one query and group it in memory
+    categories = Category.query.filter_by(is_active=True).order_by(Category.id).all()
+    main_categories = [category for category in categories if category.parent_id is None]
+    main_ids = {category.id for category in main_categories}
+    subcategories = {}
+    for category in categories:
+        if category.parent_id in main_ids:
+            subcategories.setdefault(category.parent_id, []).append(category)
+    
+    subcategory_ids = [category.id for children in subcategories.values() for category in children]
+    accounts_by_category = {}
+    if subcategory_ids:
+        # Categories are already in the identity map, so to_dict() needs no extra loads
+        for account in top_listings_per_category(subcategory_ids, per_category).all():
+            accounts_by_category.setdefault(account.category_id, []).append(account)
+    
+    result = {}
+    for main_category in main_categories:
+        result[main_category.name] = {}
+        
+        for subcategory in subcategories.get(main_category.id, []):
+            accounts = accounts_by_category.get(subcategory.id)
+            if accounts:  # Only include subcategories that have accounts
+                result[main_category.name][subcategory.name] = [account.to_dict() for account in accounts]
+    
+    return result
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from src.models.user import db
+from src.auth.identity import load_identity_user
+from src.services.outbox import PUBLIC_TOPICS, TOPICS, event_id_range, read_events, wait_for_events
+from src.utils.rate_limit import by_ip, rate_limit
+
+events_bp = Blueprint('events', __name__)
+
+class StreamSlots:
+    """Counts the event streams open in this process; each one occupies a web thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+
+    def acquire(self, limit):
+        with self._lock:
+            if self.open >= limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+stream_slots = StreamSlots()
+
+def _sse(event_id, name, data):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {name}')
+    lines.append(f'data: {data}')
+    return '\n'.join(lines) + '\n\n'
+
+def _visible_to(user):
+    """Filter letting a subscriber see only the order events of their own orders"""
+    def visible(topic, payload):
+        if topic != 'order' or user.is_admin:
+            return True
+        order = json.loads(payload)
+        return user.id in (order.get('buyer_id'), order.get('seller_id'))
+    return visible
+
+def _events(after_id, topics, visible, reset):
+    """Yield SSE frames from the outbox until EVENT_STREAM_MAX_SECONDS have passed.
+
+    Only one batch of events is held at a time, and a slow client simply
+    blocks the generator, so memory per connection stays bounded. The
+    database session is released between polls.
+    """
+    config = current_app.config
+    batch_size = config['EVENT_STREAM_BATCH_SIZE']
+    deadline = time.monotonic() + config['EVENT_STREAM_MAX_SECONDS']
+    # SQLite commits one writer at a time, so its ids become visible in order
+    settle = 0 if db.engine.dialect.name == 'sqlite' else config['OUTBOX_SETTLE_SECONDS']
+
+    yield f'retry: {config["EVENT_STREAM_RETRY_MS"]}\n\n'
+    if reset:
+        # Events after the client's id were pruned or are unknown; it has to
+        # reload its state and continues from the newest event
+        yield _sse(after_id, 'reset', '{}')
+    last_write = time.monotonic()
+    while time.monotonic() < deadline:
+        try:
+            rows = read_events(after_id, batch_size, topics, settle)
+        finally:
+            db.session.remove()
+        for event_id, topic, action, payload in rows:
+            after_id = event_id
+            if visible(topic, payload):
+                yield _sse(event_id, f'{topic}.{action}', payload)
+                last_write = time.monotonic()
+        if len(rows) == batch_size:
+            continue
+        if time.monotonic() - last_write >= config['EVENT_STREAM_KEEPALIVE_SECONDS']:
+            # Comment line; keeps proxies from closing an idle connection
+            yield ': keepalive\n\n'
+            last_write = time.monotonic()
+        wait_for_events(config['EVENT_STREAM_POLL_INTERVAL'])
+
+@events_bp.route('/events', methods=['GET'])
+@rate_limit('events', '30/minute burst 10', key=by_ip)
+def stream_events():
+    """Stream Account, Category and Order changes as Server-Sent Events.
+
+    ``topics`` is a comma-separated subset of account, category and order
+    (default account,category). Order events need a JWT and only include
+    the caller's own orders unless they are an admin. A reconnecting client
+    resumes with the ``Last-Event-ID`` header (EventSource sends it
+    automatically) or the ``last_event_id`` parameter; without either the
+    stream starts after the newest event. Streams end after
+    EVENT_STREAM_MAX_SECONDS and clients reconnect where they left off.
+    """
+    topics = tuple(dict.fromkeys(
+        topic.strip() for topic in request.args.get('topics', ','.join(PUBLIC_TOPICS)).split(',') if topic.strip()
+    ))
+    unknown = [topic for topic in topics if topic not in TOPICS.values()]
+    if unknown or not topics:
+        return jsonify({'error': f'topics must be a subset of {", ".join(TOPICS.values())}'}), 400
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return jsonify({'error': 'Last-Event-ID must be an integer'}), 400
+
+    visible = lambda topic, payload: True
+    if 'order' in topics:
+        verify_jwt_in_request()
+        user = load_identity_user(get_jwt_identity())
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        visible = _visible_to(user)
+
+    if not stream_slots.acquire(current_app.config['EVENT_STREAM_MAX_CONNECTIONS']):
+        response = jsonify({'error': 'Too many open event streams, retry shortly'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    try:
+        oldest, newest = event_id_range()
+        # Reset a client whose events were pruned, or whose id is newer than
+        # any event here (e.g. from another deployment's outbox)
+        reset = last_event_id is not None and (
+            (oldest is not None and last_event_id < oldest - 1) or last_event_id > (newest or 0)
+        )
+        if last_event_id is None or reset:
+            last_event_id = newest or 0
+        # Hold no pooled connection while the response is handed to the server
+        db.session.remove()
+
+        response = Response(
+            stream_with_context(_events(last_event_id, topics, visible, reset)),
+            mimetype='text/event-stream',
+            # Stop nginx-style proxies from buffering the stream
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception:
+        stream_slots.release()
+        raise
+    response.call_on_close(stream_slots.release)
+    return response
@@ -0,0 +1,162 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.account import Account, Order, OrderIdempotencyKey
+from src.auth.identity import load_identity_user
+from src.services.inventory import order_items
+from src.services.orders import deliver_by_hand, submit_order
+from src.services.outbox import record_events
+from src.utils.rate_limit import rate_limit
+
+order_bp = Blueprint('order', __name__)
+
+def _existing_order(buyer_id, key):
+    record = OrderIdempotencyKey.query.filter_by(buyer_id=buyer_id, key=key).first()
+    return record.order if record else None
+
+def _order_response(order):
+    """An order with the payloads of the units delivered to it"""
+    return {**order.to_dict(), 'items': order_items(order.id)}
+
+def reserve_stock(account_id, quantity):
+    """Atomically take ``quantity`` units of an active listing's stock.
+
+    A single conditional UPDATE both checks and decrements, so concurrent
+    buyers can never oversell. Returns False when there is not enough stock.
+    """
+    result = db.session.execute(
+        update(Account)
+        .where(
+            Account.id == account_id,
+            Account.status == 'active',
+            Account.stock_quantity >= quantity
+        )
+        .values(stock_quantity=Account.stock_quantity - quantity)
+        .returning(Account.stock_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    stock = result.scalar_one_or_none()
+    if stock is None:
+        return False
+    record_events('account', 'updated', [(account_id, {'stock_quantity': stock, 'changed': ['stock_quantity']})])
+    return True
+
+@order_bp.route('/orders', methods=['POST'])
+@jwt_required()
+@rate_limit('orders', '30/minute burst 10')
+def place_order():
+    """Place an order for a listing, reserving its stock.
+
+    Repeating a request with the same ``Idempotency-Key`` header returns the
+    order created by the first one instead of placing a second order.
+
+    The order is returned as ``pending`` with 202 and processed by a job
+    worker; poll ``GET /orders/<id>`` until it is ``completed`` and carries
+    the delivered ``items``. Orders of listings without inventory, or
+    placed before its first upload, stay ``pending`` until the seller
+    delivers them by hand and confirms with ``POST /orders/<id>/deliver``.
+    """
+    try:
+        buyer_id = int(get_jwt_identity())
+        data = request.get_json() or {}
+        idempotency_key = request.headers.get('Idempotency-Key')
+        
+        account_id = data.get('account_id')
+        quantity = data.get('quantity')
+        if not isinstance(account_id, int) or not isinstance(quantity, int) or quantity < 1:
+            return jsonify({'error': 'account_id and a positive integer quantity are required'}), 400
+        
+        if idempotency_key:
+            order = _existing_order(buyer_id, idempotency_key)
+            if order:
+                return jsonify(_order_response(order)), 200
+        
+        account = db.session.get(Account, account_id)
+        if not account or account.status != 'active':
+            return jsonify({'error': 'Account not found'}), 404
+        
+        min_quantity = account.min_order_quantity or 1
+        if quantity < min_quantity:
+            return jsonify({'error': f'Minimum order quantity is {min_quantity}'}), 400
+        
+        if not reserve_stock(account_id, quantity):
+            db.session.rollback()
+            return jsonify({'error': 'Insufficient stock'}), 409
+        # The reservation bypassed the identity map; reload stock when next read
+        db.session.expire(account, ['stock_quantity', 'updated_at'])
+        
+        order = Order(
+            buyer_id=buyer_id,
+            seller_id=account.seller_id,
+            account_id=account_id,
+            quantity=quantity,
+            unit_price=account.price,
+            total_amount=account.price * quantity,
+            status='pending',
+            payment_method=data.get('payment_method')
+        )
+        db.session.add(order)
+        db.session.flush()
+        # Delivery runs out of band on the job queue (see src/services/orders.py)
+        submit_order(order)
+        if idempotency_key:
+            db.session.add(OrderIdempotencyKey(buyer_id=buyer_id, key=idempotency_key, order_id=order.id))
+        
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request with the same key won; undo our reservation
+            db.session.rollback()
+            order = _existing_order(buyer_id, idempotency_key) if idempotency_key else None
+            if order is None:
+                raise
+            return jsonify(_order_response(order)), 200
+        
+        return jsonify(_order_response(order)), 202, {'Location': f'/api/orders/{order.id}'}
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/orders/<int:order_id>', methods=['GET'])
+@jwt_required()
+def get_order(order_id):
+    """Get an order and its delivered items; visible to its buyer, its seller and admins"""
+    try:
+        order = db.session.get(Order, order_id)
+        user = load_identity_user(get_jwt_identity())
+        if not order or not user or (user.id not in (order.buyer_id, order.seller_id) and not user.is_admin):
+            return jsonify({'error': 'Order not found'}), 404
+        
+        return jsonify(_order_response(order))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/orders/<int:order_id>/deliver', methods=['POST'])
+@jwt_required()
+def deliver_order(order_id):
+    """Complete a pending order of a hand-delivered listing; for its seller and admins.
+
+    ``delivery_details`` in the body is stored on the order for the buyer.
+    """
+    try:
+        order = db.session.get(Order, order_id)
+        user = load_identity_user(get_jwt_identity())
+        if not order or not user or (user.id != order.seller_id and not user.is_admin):
+            return jsonify({'error': 'Order not found'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        order = deliver_by_hand(order_id, data.get('delivery_details'))
+        if order is None:
+            db.session.rollback()
+            return jsonify({'error': 'Order is not awaiting hand delivery'}), 409
+        db.session.commit()
+        
+        return jsonify(_order_response(order))
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from src.models.user import db, User
 from src.models.account import Account, Category
+from src.services.stats import reconcile_stats
 from datetime import datetime, date
 from werkzeug.security import generate_password_hash
 
@@ -173,6 +174,8 @@ def seed_data():
             db.session.add(account)
         
         db.session.commit()
+        # The bulk deletes above bypass the incremental statistics
+        reconcile_stats(listings=False)
         
         return jsonify({"message": "Database seeded successfully"}), 201
     
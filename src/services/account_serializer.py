@@ -0,0 +1,143 @@
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from src.models.account import Account, Category
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+def _money(value):
+    return float(value) if value else 0
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+# orjson encodes date/datetime exactly like isoformat(), so they can be passed through
+_temporal = None if orjson is not None else _isoformat
+
+# Public field name -> (column, converter), in Account.to_dict() order
+ACCOUNT_FIELDS = {
+    'id': (Account.id, None),
+    'seller_id': (Account.seller_id, None),
+    'category_id': (Account.category_id, None),
+    'title': (Account.title, None),
+    'description': (Account.description, None),
+    'platform': (Account.platform, None),
+    'account_type': (Account.account_type, None),
+    'price': (Account.price, _money),
+    'stock_quantity': (Account.stock_quantity, None),
+    'min_order_quantity': (Account.min_order_quantity, None),
+    'verification_status': (Account.verification_status, None),
+    'registration_date': (Account.registration_date, _temporal),
+    'friends_count': (Account.friends_count, None),
+    'followers_count': (Account.followers_count, None),
+    'has_email': (Account.has_email, None),
+    'has_phone': (Account.has_phone, None),
+    'country': (Account.country, None),
+    'gender': (Account.gender, None),
+    'age_range': (Account.age_range, None),
+    'rating': (Account.rating, _money),
+    'success_rate': (Account.success_rate, _money),
+    'total_sales': (Account.total_sales, None),
+    'status': (Account.status, None),
+    'is_featured': (Account.is_featured, None),
+    'created_at': (Account.created_at, _temporal),
+    'updated_at': (Account.updated_at, _temporal),
+}
+
+# Nested under "category", in Category.to_dict() order
+CATEGORY_FIELDS = {
+    'id': (Category.id, None),
+    'name': (Category.name, None),
+    'slug': (Category.slug, None),
+    'description': (Category.description, None),
+    'parent_id': (Category.parent_id, None),
+    'is_active': (Category.is_active, None),
+    'created_at': (Category.created_at, _temporal),
+}
+
+DEFAULT_FIELDS = tuple(ACCOUNT_FIELDS) + ('category',)
+
+def _compile(fields, offset):
+    """Build a row -> dict function for ``fields`` read from ``row[offset:]``, keys in ``fields`` order"""
+    entries = [(name, offset + i, convert) for i, (name, (_, convert)) in enumerate(fields)]
+    
+    def to_dict(row):
+        return {name: row[index] if convert is None else convert(row[index]) for name, index, convert in entries}
+    return to_dict
+
+class AccountSchema:
+    """Selects only the columns behind a set of Account fields and encodes the rows.
+
+    The output of ``to_dicts`` matches ``Account.to_dict()`` restricted to
+    ``fields``; build instances through ``account_schema()`` so they are reused.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        account_fields = [(name, ACCOUNT_FIELDS[name]) for name in fields if name != 'category']
+        self.columns = [column for _, (column, _) in account_fields]
+        self._account = _compile(account_fields, 0)
+        
+        self.includes_category = 'category' in fields
+        if self.includes_category:
+            self._category_offset = len(self.columns)
+            self.columns += [column for column, _ in CATEGORY_FIELDS.values()]
+            self._category = _compile(list(CATEGORY_FIELDS.items()), self._category_offset)
+        
+        # Keyset position of each row, selected after the requested fields
+        self.cursor_offset = len(self.columns)
+        self.columns += [Account.is_featured, Account.created_at, Account.id]
+
+    def select(self, query):
+        """Turn an Account query into one returning just this schema's columns"""
+        if self.includes_category:
+            query = query.outerjoin(Category, Category.id == Account.category_id)
+        return query.with_entities(*self.columns)
+
+    def cursor_position(self, row):
+        return tuple(row[self.cursor_offset:self.cursor_offset + 3])
+
+    def to_dicts(self, rows):
+        account, include_category = self._account, self.includes_category
+        if not include_category:
+            return [account(row) for row in rows]
+        
+        category, category_offset = self._category, self._category_offset
+        result = []
+        for row in rows:
+            values = account(row)
+            values['category'] = category(row) if row[category_offset] is not None else None
+            result.append(values)
+        return result
+
+@lru_cache(maxsize=128)
+def account_schema(fields=DEFAULT_FIELDS):
+    return AccountSchema(fields)
+
+def parse_fields(param):
+    """Parse a sparse fieldset such as ``id,title,price``; None means every field"""
+    if not param:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in param.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in ACCOUNT_FIELDS and field != 'category']
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return fields or DEFAULT_FIELDS
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def encode_json(payload):
+    """Encode to compact JSON bytes with orjson when installed, else the stdlib.
+
+    Keys are sorted, as Flask's jsonify() sorts them, so payloads (and their
+    ETags) match the responses built from to_dict() before.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, separators=(',', ':'), sort_keys=True, default=_default).encode('utf-8')
@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import insert
+from src.extensions import db
+from src.models.account import Account, Category
+from src.services.outbox import EVENT_FIELDS, record_events
+from src.services.stats import record_new_listings
+
+# Rows inserted per executemany batch; each batch is its own transaction
+BATCH_SIZE = 500
+# Per-row errors echoed back to the client; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+def _text(value):
+    value = str(value).strip() if value is not None else ''
+    return value or None
+
+def _integer(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError('must be an integer')
+    return int(value)
+
+def _price(value):
+    try:
+        price = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError('must be a number')
+    if not price.is_finite() or price < 0:
+        raise ValueError('must be a non-negative number')
+    return price
+
+def _boolean(value):
+    if value in (None, ''):
+        return False
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', 'y'):
+        return True
+    if text in ('0', 'false', 'no', 'n'):
+        return False
+    raise ValueError('must be true or false')
+
+def _date(value):
+    return date.fromisoformat(str(value).strip()) if value not in (None, '') else None
+
+# Importable columns and their parsers. Ratings, sales and status are derived
+# by the marketplace and cannot be imported.
+FIELDS = {
+    'category_id': _integer,
+    'title': _text,
+    'description': _text,
+    'platform': _text,
+    'account_type': _text,
+    'price': _price,
+    'stock_quantity': _integer,
+    'min_order_quantity': _integer,
+    'verification_status': _text,
+    'registration_date': _date,
+    'friends_count': _integer,
+    'followers_count': _integer,
+    'has_email': _boolean,
+    'has_phone': _boolean,
+    'country': _text,
+    'gender': _text,
+    'age_range': _text,
+}
+REQUIRED = ('category_id', 'title', 'platform', 'price')
+DEFAULTS = {'stock_quantity': 1, 'min_order_quantity': 1}
+# Values the columns default to, e.g. status, for the events of inserted rows
+COLUMN_DEFAULTS = {
+    field: column.default.arg if column.default is not None and column.default.is_scalar else None
+    for field, column in ((field, Account.__table__.c[field]) for field in EVENT_FIELDS[Account])
+}
+
+def parse_csv(stream):
+    """Yield (line number, row dict) from a binary CSV stream with a header row"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield reader.line_num, row
+
+def parse_ndjson(stream):
+    """Yield (line number, row dict) from a binary stream of JSON objects, one per line"""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None
+            continue
+        yield line_number, row if isinstance(row, dict) else None
+
+def validate_row(row, category_ids):
+    """Return (values, errors) for one raw row"""
+    if row is None:
+        return None, ['not a JSON object']
+    
+    values, errors = {}, []
+    for field, parse in FIELDS.items():
+        raw = row.get(field)
+        if raw in (None, ''):
+            if field in REQUIRED:
+                errors.append(f'{field} is required')
+            elif field in DEFAULTS:
+                values[field] = DEFAULTS[field]
+            continue
+        try:
+            values[field] = parse(raw)
+        except ValueError as e:
+            errors.append(f'{field} {e}')
+    
+    if 'category_id' in values and values['category_id'] not in category_ids:
+        errors.append('category_id does not exist')
+    for field in ('stock_quantity', 'min_order_quantity'):
+        if values.get(field) is not None and values[field] < 0:
+            errors.append(f'{field} must not be negative')
+    return values, errors
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def reject(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+def _insert(rows):
+    """Insert listings and add their ``created`` events"""
+    ids = db.session.execute(
+        insert(Account).returning(Account.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    record_events('account', 'created', [
+        (account_id, {**COLUMN_DEFAULTS, **{field: values.get(field) for field in EVENT_FIELDS[Account] if field in values}})
+        for account_id, values in zip(ids, rows)
+    ])
+
+def _insert_batch(batch, report, seller_id):
+    """Insert a batch with one executemany; isolate failing rows if the batch fails"""
+    try:
+        _insert([values for _, values in batch])
+        record_new_listings(seller_id, len(batch))
+        db.session.commit()
+        report.imported += len(batch)
+        return
+    except Exception:
+        db.session.rollback()
+    
+    imported = 0
+    for line, values in batch:
+        try:
+            with db.session.begin_nested():
+                _insert([values])
+            imported += 1
+        except Exception as e:
+            report.reject(line, [str(getattr(e, 'orig', e))])
+    if imported:
+        record_new_listings(seller_id, imported)
+    db.session.commit()
+    report.imported += imported
+
+def import_accounts(rows, seller_id, batch_size=BATCH_SIZE):
+    """Validate and insert (line, row) pairs for ``seller_id`` in bounded batches.
+
+    Only one batch is held in memory at a time, so the input can be any size.
+    """
+    category_ids = {category_id for (category_id,) in db.session.query(Category.id)}
+    report = ImportReport()
+    batch = []
+    for line, row in rows:
+        values, errors = validate_row(row, category_ids)
+        if errors:
+            report.reject(line, errors)
+            continue
+        values['seller_id'] = seller_id
+        batch.append((line, values))
+        if len(batch) >= batch_size:
+            _insert_batch(batch, report, seller_id)
+            batch = []
+    if batch:
+        _insert_batch(batch, report, seller_id)
+    return report
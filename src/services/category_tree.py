@@ -0,0 +1,100 @@
+import threading
+import time
+from flask import current_app
+from src.models.account import Category
+from src.utils.change_tracking import on_commit
+from src.utils.db_routing import primary_reads
+
+class CategoryTree:
+    """Immutable snapshot of the category hierarchy with precomputed lookups.
+
+    Descendant sets and ancestor paths are computed once per snapshot, so
+    lookups are dictionary hits instead of walking ``parent_id`` with a query
+    per level.
+    """
+
+    def __init__(self, categories):
+        self._categories = {category['id']: category for category in categories}
+        self._children = {}
+        for category in categories:
+            if category['parent_id'] in self._categories:
+                self._children.setdefault(category['parent_id'], []).append(category['id'])
+        self._descendants = {}
+        self._ancestors = {}
+        for category_id in self._categories:
+            self._descendants[category_id] = frozenset(self._walk_down(category_id))
+            self._ancestors[category_id] = tuple(self._walk_up(category_id))
+
+    def _walk_down(self, category_id):
+        found, pending = {category_id}, [category_id]
+        while pending:
+            for child_id in self._children.get(pending.pop(), ()):
+                if child_id not in found:  # tolerate cycles in bad data
+                    found.add(child_id)
+                    pending.append(child_id)
+        return found
+
+    def _walk_up(self, category_id):
+        path, seen = [], set()
+        while category_id in self._categories and category_id not in seen:
+            seen.add(category_id)
+            path.append(category_id)
+            category_id = self._categories[category_id]['parent_id']
+        return reversed(path)
+
+    def get(self, category_id):
+        """The to_dict() of a category, or None"""
+        return self._categories.get(category_id)
+
+    def descendant_ids(self, category_id):
+        """Ids of the category and everything below it; empty for an unknown id"""
+        return self._descendants.get(category_id, frozenset())
+
+    def breadcrumbs(self, category_id):
+        """[{id, name, slug}] from the root down to the category"""
+        return [
+            {key: self._categories[ancestor_id][key] for key in ('id', 'name', 'slug')}
+            for ancestor_id in self._ancestors.get(category_id, ())
+        ]
+
+    def children(self, category_id):
+        return [self._categories[child_id] for child_id in self._children.get(category_id, ())]
+
+    def active(self):
+        """to_dict() of every active category, in id order"""
+        return [category for category in self._categories.values() if category['is_active']]
+
+class CategoryTreeCache:
+    """Process-wide CategoryTree, rebuilt after a commit touches Category"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = None
+        self._built_at = 0
+        self._generation = 0
+
+    def get(self, ttl=None):
+        with self._lock:
+            tree, built_at, generation = self._tree, self._built_at, self._generation
+        if tree is not None and (ttl is None or time.monotonic() - built_at < ttl):
+            return tree
+
+        with primary_reads():
+            tree = CategoryTree([category.to_dict() for category in Category.query.order_by(Category.id)])
+        with self._lock:
+            # A build that raced with an invalidation may already be stale
+            if generation == self._generation:
+                self._tree, self._built_at = tree, time.monotonic()
+        return tree
+
+    def invalidate(self, *args):
+        with self._lock:
+            self._generation += 1
+            self._tree = None
+
+category_trees = CategoryTreeCache()
+on_commit((Category,), category_trees.invalidate)
+
+def category_tree():
+    """The cached CategoryTree; CATEGORY_TREE_TTL bounds staleness in other worker processes"""
+    return category_trees.get(ttl=current_app.config.get('CATEGORY_TREE_TTL'))
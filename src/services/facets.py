@@ -0,0 +1,95 @@
+from collections import defaultdict
+from sqlalchemy import and_, case, func, literal
+from src.extensions import db
+from src.models.account import Account
+from src.services.listings import filter_listings
+
+# Categorical facets and the (lowercased for platform) column each counts
+CATEGORICAL_FACETS = {
+    'platform': func.lower(Account.platform),
+    'country': Account.country,
+    'account_type': Account.account_type,
+    'verification_status': Account.verification_status,
+}
+FACETS = tuple(CATEGORICAL_FACETS) + ('price',)
+
+# Upper edges of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKETS = (1, 5, 10, 25, 50, 100)
+
+def _price_buckets():
+    edges = (0,) + PRICE_BUCKETS
+    buckets = [{'value': f'{low}-{high}', 'min': low, 'max': high} for low, high in zip(edges, edges[1:])]
+    buckets.append({'value': f'{PRICE_BUCKETS[-1]}+', 'min': PRICE_BUCKETS[-1], 'max': None})
+    return buckets
+
+def _price_bucket():
+    """Index into _price_buckets() of an account's price"""
+    return case(
+        *[(Account.price < edge, index) for index, edge in enumerate(PRICE_BUCKETS)],
+        else_=len(PRICE_BUCKETS)
+    )
+
+def facet_query(search=None, category_id=None, min_price=None, max_price=None):
+    """One GROUP BY over every facet column at once.
+
+    Each row is a distinct combination of facet values with its count, plus
+    whether the combination's price lies in the requested range. Filters that
+    are facets themselves are applied while folding the rows, not here, so a
+    facet's counts can ignore that facet's own filter.
+    """
+    price_conditions = []
+    if min_price is not None:
+        price_conditions.append(Account.price >= min_price)
+    if max_price is not None:
+        price_conditions.append(Account.price <= max_price)
+    in_price_range = case((and_(*price_conditions), 1), else_=0) if price_conditions else literal(1)
+
+    keys = list(CATEGORICAL_FACETS.values()) + [_price_bucket().label('price_bucket'), in_price_range.label('in_price_range')]
+    query = db.session.query(*keys, func.min(Account.platform).label('platform_label'), func.count().label('count'))
+    query, _ = filter_listings(query, category_id=category_id, search=search)
+    return query.group_by(*keys)
+
+def facet_counts(platform=None, category_id=None, search=None, min_price=None, max_price=None,
+                 country=None, account_type=None, verification_status=None):
+    """Counts per value of every facet for the catalogue filters of filter_listings().
+
+    Counts are disjunctive: each facet is counted under all filters except its
+    own, so the alternatives to a selected value stay visible. ``total`` is the
+    number of listings matching every filter.
+    """
+    selected = {
+        'platform': platform.lower() if platform else None,
+        'country': country or None,
+        'account_type': account_type or None,
+        'verification_status': verification_status or None,
+    }
+    counts = {facet: defaultdict(int) for facet in FACETS}
+    platform_labels = {}
+    total = 0
+
+    rows = facet_query(search=search, category_id=category_id, min_price=min_price, max_price=max_price)
+    for *values, price_bucket, in_price_range, platform_label, count in rows:
+        values = dict(zip(CATEGORICAL_FACETS, values))
+        platform_labels.setdefault(values['platform'], platform_label)
+        matches = {facet: selected[facet] is None or values[facet] == selected[facet] for facet in selected}
+        matches['price'] = bool(in_price_range)
+        values['price'] = price_bucket
+
+        for facet in FACETS:
+            if all(matched for other, matched in matches.items() if other != facet):
+                counts[facet][values[facet]] += count
+        if all(matches.values()):
+            total += count
+
+    facets = {}
+    for facet in CATEGORICAL_FACETS:
+        entries = [
+            {'value': platform_labels[value] if facet == 'platform' else value, 'count': count}
+            for value, count in counts[facet].items() if value is not None and count
+        ]
+        facets[facet] = sorted(entries, key=lambda entry: (-entry['count'], entry['value']))
+    facets['price'] = [
+        {**bucket, 'count': counts['price'][index]}
+        for index, bucket in enumerate(_price_buckets()) if counts['price'][index]
+    ]
+    return {'facets': facets, 'total': total}
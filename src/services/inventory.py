@@ -0,0 +1,125 @@
+"""Per-unit inventory of listings.
+
+Each deliverable unit is an InventoryItem row. ``Account.stock_quantity`` is
+the counter of units still for sale: adding units increments it, and placing
+an order decrements it through reserve_stock() before the units are claimed,
+so stock is never computed with COUNT(*).
+"""
+from datetime import datetime
+from sqlalchemy import exists, func, insert, select, update
+from src.extensions import db
+from src.models.account import Account, InventoryItem
+from src.services.outbox import record_events
+
+# Units accepted by one add_inventory() call
+MAX_ITEMS_PER_UPLOAD = 1000
+
+class InventoryShortage(Exception):
+    """Fewer unclaimed units exist than the order reserved; the stock counter has drifted"""
+
+def has_inventory(account_id):
+    """Whether units were ever uploaded for a listing; listings without any are delivered by hand"""
+    return db.session.query(exists().where(InventoryItem.account_id == account_id)).scalar()
+
+def hand_delivered(order):
+    """Whether an order is delivered by hand: it was placed before its listing's first unit was uploaded.
+
+    Placing an order and the first upload both write the listing row, so
+    they commit one after the other and the order's timestamp falls on the
+    right side of the first unit's.
+    """
+    first_unit = db.session.execute(
+        select(func.min(InventoryItem.created_at)).where(InventoryItem.account_id == order.account_id)
+    ).scalar()
+    return first_unit is None or order.created_at < first_unit
+
+def add_inventory(account_id, payloads):
+    """Insert one unit per payload and raise the listing's stock by as many, in the current transaction.
+
+    The first upload switches a listing from hand delivery to inventory
+    delivery, so its stock becomes the number of units instead. Orders
+    placed before it keep their reservation and are still delivered by hand
+    (see hand_delivered()); none of the new units are set aside for them.
+    """
+    if not payloads:
+        return 0
+    # A no-op UPDATE locks the listing row (and on SQLite opens the write
+    # transaction) before inventory is checked, so two concurrent first
+    # uploads cannot both see none and each set the stock to their own count
+    db.session.execute(
+        update(Account)
+        .where(Account.id == account_id)
+        .values(stock_quantity=Account.stock_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    stock = Account.stock_quantity + len(payloads) if has_inventory(account_id) else len(payloads)
+    db.session.execute(insert(InventoryItem), [{'account_id': account_id, 'payload': payload} for payload in payloads])
+    stock = db.session.execute(
+        update(Account)
+        .where(Account.id == account_id)
+        .values(stock_quantity=stock)
+        .returning(Account.stock_quantity)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    record_events('account', 'updated', [(account_id, {'stock_quantity': stock, 'changed': ['stock_quantity']})])
+    return len(payloads)
+
+def _claim_statement(account_id, order_id, quantity, dialect):
+    candidates = (
+        select(InventoryItem.id)
+        .where(InventoryItem.account_id == account_id, InventoryItem.order_id.is_(None))
+        .order_by(InventoryItem.id)
+        .limit(quantity)
+    )
+    if dialect == 'postgresql':
+        # Concurrent claimers skip each other's rows instead of queueing on them
+        candidates = candidates.with_for_update(skip_locked=True)
+    return (
+        update(InventoryItem)
+        # Re-checking order_id keeps a row claimed by a concurrent transaction out
+        .where(InventoryItem.id.in_(candidates.scalar_subquery()), InventoryItem.order_id.is_(None))
+        .values(order_id=order_id, claimed_at=datetime.utcnow())
+        .returning(InventoryItem.id)
+        .execution_options(synchronize_session=False)
+    )
+
+def claim_units(account_id, order_id, quantity):
+    """Attach up to ``quantity`` unclaimed units of a listing to an order in one statement.
+
+    On PostgreSQL the candidate rows are locked with ``FOR UPDATE SKIP
+    LOCKED``; SQLite runs one writer at a time, so the same UPDATE ... WHERE
+    id IN (SELECT ... LIMIT n) is already atomic there. Returns the claimed ids.
+    """
+    dialect = db.session.get_bind(mapper=InventoryItem).dialect.name
+    statement = _claim_statement(account_id, order_id, quantity, dialect)
+    return [item_id for (item_id,) in db.session.execute(statement)]
+
+def fulfil_order(order):
+    """Claim the order's units and complete it, in the current transaction.
+
+    Orders of listings without inventory, or placed before its first
+    upload, are delivered by hand: they are left as they are and False is
+    returned.
+    """
+    if hand_delivered(order):
+        return False
+    claimed = claim_units(order.account_id, order.id, order.quantity)
+    if len(claimed) < order.quantity:
+        if claimed:
+            # Hand back the partial claim so the caller can fail the order and commit
+            db.session.execute(
+                update(InventoryItem)
+                .where(InventoryItem.id.in_(claimed))
+                .values(order_id=None, claimed_at=None)
+                .execution_options(synchronize_session=False)
+            )
+        raise InventoryShortage(f'Order {order.id} needs {order.quantity} units, only {len(claimed)} were available')
+    order.status = 'completed'
+    order.completed_at = datetime.utcnow()
+    return True
+
+def order_items(order_id):
+    """Payloads delivered to an order, in claim order"""
+    return [payload for (payload,) in db.session.execute(
+        select(InventoryItem.payload).where(InventoryItem.order_id == order_id).order_by(InventoryItem.id)
+    )]
@@ -0,0 +1,176 @@
+"""Durable background jobs stored in the application database.
+
+Jobs are enqueued in the same transaction as the writes that need them, so
+a job exists exactly when its transaction committed. Workers claim due jobs
+in batches with one UPDATE (``FOR UPDATE SKIP LOCKED`` on PostgreSQL) under a
+time-limited lease, run each job's task and its bookkeeping in one
+transaction, retry failures with exponential backoff and park jobs that
+keep failing as ``dead`` for inspection (``flask jobs-dead``).
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, select, update
+from src.extensions import db
+from src.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+Task = namedtuple('Task', ['func', 'max_attempts'])
+# Claimed job as handed to run_job()
+ClaimedJob = namedtuple('ClaimedJob', ['id', 'kind', 'payload', 'attempts', 'max_attempts'])
+
+# kind -> Task, filled by the @task decorator
+_tasks = {}
+
+class PermanentJobError(Exception):
+    """Raised by a task whose failure retrying cannot fix; the job goes straight to dead"""
+
+def task(kind, max_attempts=None):
+    """Register ``func(payload)`` as the handler of jobs of ``kind``"""
+    def decorator(func):
+        _tasks[kind] = Task(func, max_attempts)
+        return func
+    return decorator
+
+def enqueue(kind, payload=None, delay=0):
+    """Add a job to the current transaction; it becomes visible to workers on commit"""
+    registered = _tasks.get(kind)
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        max_attempts=(registered and registered.max_attempts) or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.session.add(job)
+    return job
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+def claim_jobs(worker, limit, lease_seconds):
+    """Lease up to ``limit`` due jobs to ``worker`` in one statement and commit"""
+    now = datetime.utcnow()
+    candidates = (
+        select(Job.id)
+        .where(or_(
+            (Job.status == 'queued') & (Job.run_at <= now),
+            # Lease ran out: the worker holding it died mid-job
+            (Job.status == 'running') & (Job.locked_until < now)
+        ))
+        .order_by(Job.run_at, Job.id)
+        .limit(limit)
+    )
+    if db.session.get_bind(mapper=Job).dialect.name == 'postgresql':
+        candidates = candidates.with_for_update(skip_locked=True)
+    rows = db.session.execute(
+        update(Job)
+        .where(Job.id.in_(candidates.scalar_subquery()))
+        .values(status='running', locked_by=worker, locked_until=now + timedelta(seconds=lease_seconds),
+                attempts=Job.attempts + 1)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.session.commit()
+    return [ClaimedJob(*row) for row in rows]
+
+def backoff_seconds(attempts):
+    """Exponential delay before retry number ``attempts``, with jitter so failed batches spread out"""
+    base = current_app.config['JOB_BACKOFF_SECONDS']
+    delay = min(current_app.config['JOB_BACKOFF_MAX_SECONDS'], base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+def _finish(job, worker, **values):
+    """Update a job we still hold; False when the lease was lost to another worker"""
+    result = db.session.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.locked_by == worker, Job.status == 'running')
+        .values(locked_by=None, locked_until=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def run_job(job, worker):
+    """Run one claimed job; its task's writes commit together with the job's completion"""
+    try:
+        registered = _tasks.get(job.kind)
+        if registered is None:
+            raise PermanentJobError(f'No task registered for {job.kind!r}')
+        registered.func(json.loads(job.payload))
+        if not _finish(job, worker, status='done', finished_at=datetime.utcnow(), last_error=None):
+            # Another worker took over after our lease expired; keep only its result
+            db.session.rollback()
+            return 'lost'
+        db.session.commit()
+        return 'done'
+    except Exception as e:
+        db.session.rollback()
+        error = f'{type(e).__name__}: {e}'
+        if isinstance(e, PermanentJobError) or job.attempts >= job.max_attempts:
+            logger.error('Job %s (%s) is dead after %s attempts: %s', job.id, job.kind, job.attempts, error)
+            _finish(job, worker, status='dead', finished_at=datetime.utcnow(), last_error=error)
+            outcome = 'dead'
+        else:
+            logger.warning('Job %s (%s) failed attempt %s: %s', job.id, job.kind, job.attempts, error)
+            _finish(job, worker, status='queued', last_error=error,
+                    run_at=datetime.utcnow() + timedelta(seconds=backoff_seconds(job.attempts)))
+            outcome = 'retry'
+        db.session.commit()
+        return outcome
+
+def work(stop=None, once=False, worker=None):
+    """Process jobs until ``stop`` is set; with ``once``, return when no job is due.
+
+    Must run inside an application context. Returns the count of each outcome.
+    """
+    config = current_app.config
+    worker = worker or worker_name()
+    stop = stop or threading.Event()
+    outcomes = {'done': 0, 'retry': 0, 'dead': 0, 'lost': 0}
+    while not stop.is_set():
+        try:
+            jobs = claim_jobs(worker, config['JOB_BATCH_SIZE'], config['JOB_LEASE_SECONDS'])
+            for job in jobs:
+                outcomes[run_job(job, worker)] += 1
+        except Exception:
+            db.session.rollback()
+            logger.exception('Job worker %s failed to claim jobs', worker)
+            jobs = []
+        finally:
+            # Do not keep a connection checked out between polls
+            db.session.remove()
+        if not jobs:
+            if once:
+                break
+            stop.wait(config['JOB_POLL_INTERVAL'])
+    return outcomes
+
+def start_worker_threads(app, count):
+    """Run ``count`` daemon worker threads in this process; returns the Event that stops them"""
+    stop = threading.Event()
+
+    def run():
+        with app.app_context():
+            work(stop)
+
+    for index in range(count):
+        threading.Thread(target=run, name=f'job-worker-{index}', daemon=True).start()
+    return stop
+
+def retry_dead(job_ids=None):
+    """Queue dead jobs (all, or the given ids) for a fresh round of attempts; returns how many"""
+    statement = update(Job).where(Job.status == 'dead')
+    if job_ids:
+        statement = statement.where(Job.id.in_(job_ids))
+    result = db.session.execute(
+        statement.values(status='queued', attempts=0, run_at=datetime.utcnow(), finished_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,124 @@
+from itertools import chain
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from src.extensions import db
+from src.models.account import Account, Category
+from src.models.stats import StatCounter
+from src.services.category_tree import category_tree
+from src.services.search import search_accounts
+from src.services.stats import increment_counter
+
+# StatCounter bumped by every transaction that deletes listings or changes
+# categories, the catalogue changes max(Account.updated_at) cannot see
+CATALOGUE_VERSION = 'catalogue_version'
+
+def listing_filters(args):
+    """Extract the catalogue filters understood by filter_listings() from request args"""
+    return {
+        'platform': args.get('platform'),
+        'category_id': args.get('category_id', type=int),
+        'search': args.get('search'),
+        'min_price': args.get('min_price', type=float),
+        'max_price': args.get('max_price', type=float),
+        'country': args.get('country'),
+        'account_type': args.get('account_type'),
+        'verification_status': args.get('verification_status')
+    }
+
+def listing_order(search_rank=None):
+    """ORDER BY for listings: featured first, then newest, id keeping the order stable"""
+    if search_rank is not None:
+        return [Account.is_featured.desc(), search_rank, Account.created_at.desc(), Account.id.desc()]
+    return [Account.is_featured.desc(), Account.created_at.desc(), Account.id.desc()]
+
+def filter_listings(query, platform=None, category_id=None, search=None, min_price=None, max_price=None,
+                    country=None, account_type=None, verification_status=None):
+    """Restrict an Account query to active listings matching the catalogue filters.
+
+    Returns ``(query, search_rank)``; ``search_rank`` is ``None`` unless a
+    full-text search ranked the matches.
+    """
+    query = query.filter(Account.status == 'active')
+    
+    if platform:
+        # Case-insensitive equality so ix_account_platform_listing can be used
+        query = query.filter(func.lower(Account.platform) == platform.lower())
+    
+    if category_id:
+        # A parent category matches the listings of all its subcategories
+        category_ids = category_tree().descendant_ids(category_id)
+        if len(category_ids) > 1:
+            query = query.filter(Account.category_id.in_(sorted(category_ids)))
+        else:
+            query = query.filter(Account.category_id == category_id)
+    
+    search_rank = None
+    if search:
+        query, search_rank = search_accounts(query, search)
+    
+    if min_price is not None:
+        query = query.filter(Account.price >= min_price)
+    
+    if max_price is not None:
+        query = query.filter(Account.price <= max_price)
+    
+    # Exact-match attribute filters offered as facets (see src/services/facets.py)
+    if country:
+        query = query.filter(Account.country == country)
+    
+    if account_type:
+        query = query.filter(Account.account_type == account_type)
+    
+    if verification_status:
+        query = query.filter(Account.verification_status == verification_status)
+    
+    return query, search_rank
+
+def top_listings_per_category(category_ids, limit):
+    """Query for the first ``limit`` active accounts of each category, in listing order.
+
+    A single ``ROW_NUMBER() OVER (PARTITION BY category_id)`` window replaces
+    one query per category.
+    """
+    ranked = db.session.query(
+        Account.id.label('account_id'),
+        func.row_number().over(
+            partition_by=Account.category_id,
+            order_by=listing_order()
+        ).label('position')
+    ).filter(
+        Account.status == 'active',
+        Account.category_id.in_(category_ids)
+    ).subquery()
+    
+    return Account.query.join(ranked, ranked.c.account_id == Account.id).filter(
+        ranked.c.position <= limit
+    ).order_by(Account.category_id, ranked.c.position)
+
+def listing_validators():
+    """(version, last modified) of the catalogue, for conditional GETs of listings.
+
+    Newest ``updated_at`` catches inserts and edits, the catalogue version
+    counter catches deletes and category changes. Both are index lookups,
+    so revalidation never counts rows.
+    """
+    last_modified, version = db.session.query(
+        db.session.query(func.max(Account.updated_at)).scalar_subquery(),
+        db.session.query(StatCounter.value).filter(StatCounter.name == CATALOGUE_VERSION).scalar_subquery()
+    ).one()
+    return f'{last_modified}:{version or 0}', last_modified
+
+@event.listens_for(Session, 'after_flush')
+def _bump_catalogue_version(session, flush_context):
+    if any(isinstance(obj, Account) for obj in session.deleted) or \
+            any(isinstance(obj, Category) for obj in chain(session.new, session.dirty, session.deleted)):
+        increment_counter(session.connection(), CATALOGUE_VERSION)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bump_catalogue_version_in_bulk(orm_execute_state):
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    if (orm_execute_state.is_delete and mapper.class_ is Account) or (mapper.class_ is Category and (
+            orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete)):
+        increment_counter(orm_execute_state.session.connection(), CATALOGUE_VERSION)
@@ -0,0 +1,77 @@
+from datetime import datetime
+from sqlalchemy import update
+from src.extensions import db
+from src.models.account import Account, Order
+from src.services.inventory import InventoryShortage, fulfil_order, hand_delivered
+from src.services.outbox import record_events
+from src.services.jobs import enqueue, task
+
+PROCESS_ORDER = 'orders.process'
+
+def submit_order(order):
+    """Queue a flushed pending order for processing when the current transaction commits"""
+    return enqueue(PROCESS_ORDER, {'order_id': order.id})
+
+def _lock_pending(order_id):
+    """Lock a pending order's row; returns the order, or None when it is no longer pending.
+
+    A no-op conditional UPDATE locks the row (and on SQLite opens the write
+    transaction), so a concurrent run waits here and then finds the order
+    no longer pending instead of delivering it a second time.
+    """
+    locked = db.session.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.status == 'pending')
+        .values(status='pending')
+        .execution_options(synchronize_session=False)
+    )
+    if locked.rowcount != 1:
+        return None
+    return db.session.get(Order, order_id, populate_existing=True)
+
+def _release_stock(order):
+    """Put a failed order's reserved units back on sale"""
+    stock = db.session.execute(
+        update(Account)
+        .where(Account.id == order.account_id)
+        .values(stock_quantity=Account.stock_quantity + order.quantity)
+        .returning(Account.stock_quantity)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    record_events('account', 'updated', [(order.account_id, {'stock_quantity': stock, 'changed': ['stock_quantity']})])
+
+@task(PROCESS_ORDER)
+def process_order(payload):
+    """Deliver a pending order's units and complete it, outside the request that placed it.
+
+    Safe to run more than once: only an order still pending is processed.
+    Orders of listings without inventory, or placed before its first
+    upload, are delivered by hand and stay pending until their seller
+    calls deliver_by_hand().
+    """
+    order = _lock_pending(payload['order_id'])
+    if order is None:
+        return
+    try:
+        fulfil_order(order)
+    except InventoryShortage:
+        # Retrying cannot create units; record the failure on the order and
+        # return its reservation to the listing in the same transaction
+        order.status = 'failed'
+        _release_stock(order)
+
+def deliver_by_hand(order_id, delivery_details=None):
+    """Complete a pending order of a hand-delivered listing, in the current transaction.
+
+    Returns the order, or None when it is not pending or not delivered by
+    hand (orders placed after the listing's first upload are delivered from
+    its inventory by process_order()).
+    """
+    order = _lock_pending(order_id)
+    if order is None or not hand_delivered(order):
+        return None
+    order.status = 'completed'
+    order.completed_at = datetime.utcnow()
+    if delivery_details is not None:
+        order.delivery_details = delivery_details
+    return order
@@ -0,0 +1,142 @@
+"""Transactional outbox of Account, Order and Category changes.
+
+Every flush that inserts, updates or deletes one of these models appends an
+OutboxEvent in the same transaction, so an event exists exactly when its
+change committed. Statements that bypass the unit of work (the stock UPDATEs
+of ordering and inventory uploads, bulk imports) call record_events()
+themselves. Subscribers read the outbox in id order through
+``GET /api/events``; ``flask outbox-prune`` drops old events.
+"""
+import json
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+from src.extensions import db
+from src.models.account import Account, Category, Order
+from src.models.outbox import OutboxEvent
+
+TOPICS = {Account: 'account', Order: 'order', Category: 'category'}
+# Topics anyone may subscribe to; order events only go to their buyer and seller
+PUBLIC_TOPICS = ('account', 'category')
+
+# Columns carried in event payloads. Changes to other columns (descriptions,
+# the materialized total_sales, timestamps) do not produce an event.
+EVENT_FIELDS = {
+    Account: ('seller_id', 'category_id', 'title', 'platform', 'account_type', 'price',
+              'stock_quantity', 'min_order_quantity', 'status', 'is_featured'),
+    Order: ('buyer_id', 'seller_id', 'account_id', 'quantity', 'total_amount', 'status'),
+    Category: ('name', 'slug', 'parent_id', 'is_active')
+}
+
+# Events deleted per statement by prune_events(), so SQLite's write lock is held briefly
+PRUNE_BATCH_SIZE = 10000
+
+# Woken after a commit in this process wrote events, so local streams need not wait a poll
+_new_events = threading.Condition()
+
+def _row(topic, action, entity_id, fields):
+    return {
+        'topic': topic,
+        'action': action,
+        'entity_id': entity_id,
+        # Decimal prices are sent as numbers, like to_dict() does
+        'payload': json.dumps({'id': entity_id, **fields}, default=float, separators=(',', ':')),
+        'created_at': datetime.utcnow()
+    }
+
+def _flushed_event(obj, action):
+    model = type(obj)
+    fields = EVENT_FIELDS[model]
+    state = inspect(obj)
+    if action == 'deleted':
+        # The row is gone; send what is still loaded
+        return _row(TOPICS[model], action, obj.id, {field: state.dict[field] for field in fields if field in state.dict})
+
+    changed = None
+    if action == 'updated':
+        changed = [field for field in fields if state.attrs[field].history.has_changes()]
+        if not changed:
+            return None
+    values = {field: getattr(obj, field) for field in fields}
+    if changed:
+        values['changed'] = changed
+    return _row(TOPICS[model], action, obj.id, values)
+
+def _write(session, rows):
+    if rows:
+        session.connection().execute(insert(OutboxEvent), rows)
+        session.info['outbox_written'] = True
+
+def record_events(topic, action, entities):
+    """Add events for ``(entity_id, fields)`` pairs changed by a bulk statement, in the current transaction.
+
+    ``fields`` of an ``updated`` event should include ``changed``, the list
+    of columns the statement set.
+    """
+    _write(db.session, [_row(topic, action, entity_id, fields) for entity_id, fields in entities])
+
+@event.listens_for(Session, 'after_flush')
+def _collect_events(session, flush_context):
+    rows = []
+    for objects, action in ((session.new, 'created'), (session.dirty, 'updated'), (session.deleted, 'deleted')):
+        for obj in objects:
+            if type(obj) in TOPICS:
+                row = _flushed_event(obj, action)
+                if row is not None:
+                    rows.append(row)
+    _write(session, rows)
+
+@event.listens_for(Session, 'after_commit')
+def _notify_streams(session):
+    if session.info.pop('outbox_written', False):
+        with _new_events:
+            _new_events.notify_all()
+
+@event.listens_for(Session, 'after_transaction_end')
+def _forget_written(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('outbox_written', None)
+
+def wait_for_events(timeout):
+    """Block until a commit in this process writes events, or ``timeout`` seconds pass"""
+    with _new_events:
+        _new_events.wait(timeout)
+
+def read_events(after_id, limit, topics=PUBLIC_TOPICS, settle_seconds=0):
+    """Up to ``limit`` (id, topic, action, payload) rows after ``after_id``, in id order.
+
+    On PostgreSQL ids are drawn when a row is inserted, not when it commits,
+    so a reader can see id n+1 before a slower transaction commits id n.
+    ``settle_seconds`` holds back events younger than that, giving such
+    transactions time to commit before the cursor moves past their ids.
+    """
+    statement = (
+        select(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.action, OutboxEvent.payload)
+        .where(OutboxEvent.id > after_id, OutboxEvent.topic.in_(topics))
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+    )
+    if settle_seconds:
+        statement = statement.where(OutboxEvent.created_at <= datetime.utcnow() - timedelta(seconds=settle_seconds))
+    return db.session.execute(statement).all()
+
+def event_id_range():
+    """(oldest, newest) retained event id, or (None, None) for an empty outbox"""
+    return tuple(db.session.execute(select(func.min(OutboxEvent.id), func.max(OutboxEvent.id))).one())
+
+def prune_events(days):
+    """Delete events older than ``days`` days in bounded batches; returns how many"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    pruned = 0
+    while True:
+        batch = select(OutboxEvent.id).where(OutboxEvent.created_at < cutoff).limit(PRUNE_BATCH_SIZE)
+        result = db.session.execute(
+            delete(OutboxEvent)
+            .where(OutboxEvent.id.in_(batch.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        pruned += result.rowcount
+        if result.rowcount < PRUNE_BATCH_SIZE:
+            return pruned
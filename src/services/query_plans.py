@@ -0,0 +1,62 @@
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from src.extensions import db
+from src.models.account import Account, InventoryItem
+from src.services.facets import facet_query
+from src.services.listings import filter_listings, listing_order, top_listings_per_category
+
+# Listing filter combinations served by GET /api/accounts
+LISTING_SCENARIOS = [
+    ('default listing', {}),
+    ('platform filter', {'platform': 'Facebook'}),
+    ('category filter', {'category_id': 1}),
+    ('price range', {'min_price': 0.5, 'max_price': 5}),
+    ('category and price', {'category_id': 1, 'max_price': 5}),
+    ('platform and price', {'platform': 'Facebook', 'min_price': 0.5}),
+    ('search', {'search': 'email'}),
+]
+
+# Tables big enough that a full scan is a problem
+LARGE_TABLES = {'account', 'order', 'inventory_item'}
+
+def listing_queries(per_page=20):
+    """Yield (name, statement) for the queries the listing endpoints run"""
+    for name, filters in LISTING_SCENARIOS:
+        query, search_rank = filter_listings(Account.query, **filters)
+        yield name, query.order_by(*listing_order(search_rank)).limit(per_page).statement
+    yield 'homepage top per category', top_listings_per_category([1, 2, 3], 5).statement
+    yield 'facet counts', facet_query(category_id=1, max_price=5).statement
+
+def _explain(conn, statement):
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    if conn.dialect.name == 'sqlite':
+        return [row.detail for row in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    return [row[0] for row in conn.execute(text(f'EXPLAIN {sql}'))]
+
+def _full_scans(plan):
+    problems = []
+    for line in plan:
+        words = line.replace('"', '').split()
+        # SQLite: "SCAN account" (no USING INDEX); Postgres: "Seq Scan on account"
+        if words[:1] == ['SCAN'] and len(words) > 1 and words[1] in LARGE_TABLES and 'USING' not in words:
+            problems.append(line)
+        elif 'Seq Scan on' in line and words[words.index('on') + 1] in LARGE_TABLES:
+            problems.append(line)
+    return problems
+
+def check_listing_plans():
+    """Return [(name, plan lines, full-scan lines)] for every listing query"""
+    results = []
+    with db.engine.connect() as conn:
+        for name, statement in listing_queries():
+            plan = _explain(conn, statement)
+            results.append((name, plan, _full_scans(plan)))
+    return results
+
+def create_missing_indexes():
+    """Create declared Account and InventoryItem indexes that an existing database is missing"""
+    # IF NOT EXISTS rather than checkfirst: expression indexes cannot be reflected
+    with db.engine.begin() as conn:
+        for table in (Account.__table__, InventoryItem.__table__):
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
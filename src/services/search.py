@@ -0,0 +1,119 @@
+import re
+from sqlalchemy import column, literal_column, or_, select, table, text, func
+from src.extensions import db
+from src.models.account import Account
+
+# SQLite: an external-content FTS5 table over account(title, description),
+# kept in sync by triggers so ORM writes, bulk statements and raw SQL all
+# update the index.
+SQLITE_FTS_TABLE = 'account_fts'
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5(
+        title, description, content='account', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS account_fts_insert AFTER INSERT ON account BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS account_fts_delete AFTER DELETE ON account BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS account_fts_update AFTER UPDATE OF title, description ON account BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+# Postgres: a GIN expression index, which the planner keeps in sync by itself
+POSTGRES_INDEX = 'ix_account_search'
+POSTGRES_DOCUMENT = "to_tsvector('simple', coalesce(account.title, '') || ' ' || coalesce(account.description, ''))"
+POSTGRES_DDL = [
+    f'CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX} ON account USING GIN (({POSTGRES_DOCUMENT}))',
+]
+
+_fts = table(SQLITE_FTS_TABLE, column('rowid'), column('rank'))
+
+# Engines known to have the search index, so requests skip the catalog lookup
+_available = {}
+
+def _terms(search):
+    return re.findall(r'\w+', search, re.UNICODE)
+
+def ensure_search_index():
+    """Create the search index and its sync triggers if the backend supports them"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_DDL
+    elif dialect == 'postgresql':
+        statements = POSTGRES_DDL
+    else:
+        return False
+    
+    _available.pop(db.engine, None)
+    created = not search_index_available() if dialect == 'sqlite' else False
+    with db.engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+        if created:
+            # A new external-content table starts empty; index the existing rows
+            conn.execute(text(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')"))
+    _available.pop(db.engine, None)
+    return True
+
+def rebuild_search_index():
+    """Re-index every existing account, e.g. after importing data with triggers absent"""
+    if not ensure_search_index():
+        return False
+    
+    with db.engine.begin() as conn:
+        if db.engine.dialect.name == 'sqlite':
+            conn.execute(text(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')"))
+        else:
+            conn.execute(text(f'REINDEX INDEX {POSTGRES_INDEX}'))
+    return True
+
+def search_index_available():
+    engine = db.engine
+    if engine not in _available:
+        dialect = engine.dialect.name
+        if dialect == 'sqlite':
+            with engine.connect() as conn:
+                _available[engine] = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': SQLITE_FTS_TABLE}
+                ).first() is not None
+        else:
+            _available[engine] = dialect == 'postgresql'
+    return _available[engine]
+
+def search_accounts(query, search):
+    """Restrict an Account query to rows matching ``search``.
+
+    Returns ``(query, rank)`` where ``rank`` is an ORDER BY expression putting
+    the best matches first, or ``None`` when the backend has no search index
+    and the query fell back to a substring scan.
+    """
+    terms = _terms(search)
+    if not terms or not search_index_available():
+        return query.filter(or_(
+            Account.title.ilike(f'%{search}%'),
+            Account.description.ilike(f'%{search}%')
+        )), None
+    
+    if db.engine.dialect.name == 'sqlite':
+        # Quote every term so user input cannot inject FTS5 query syntax;
+        # the trailing * keeps prefix matching for partially typed words.
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        matches = select(
+            _fts.c.rowid.label('account_id'),
+            _fts.c.rank.label('rank')
+        ).where(literal_column(SQLITE_FTS_TABLE).op('MATCH')(match)).subquery()
+        query = query.join(matches, matches.c.account_id == Account.id)
+        return query, matches.c.rank
+    
+    document = literal_column(POSTGRES_DOCUMENT)
+    tsquery = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+    query = query.filter(document.op('@@')(tsquery))
+    return query, func.ts_rank(document, tsquery).desc()
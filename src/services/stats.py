@@ -0,0 +1,400 @@
+"""Materialized marketplace statistics.
+
+Counters (StatCounter), per-seller aggregates (SellerStats) and per-platform
+and per-category sales (SalesBreakdown) are updated incrementally in the same
+transaction as the Order, Account and User writes that change them, so the
+admin dashboard reads them instead of counting rows. Deltas are collected per
+flush and written once when the transaction commits. Writes that bypass the
+ORM unit of work (bulk statements) are not seen; ``reconcile_stats()``
+recomputes everything from the base tables and is run periodically through
+``flask stats-reconcile``.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from sqlalchemy import String, cast, event, func, inspect, literal_column, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from src.extensions import db
+from src.models.account import Account, Category, Order
+from src.models.stats import SalesBreakdown, SellerStats, StatCounter
+from src.models.user import User
+
+COMPLETED = 'completed'
+# Finished orders that count against a seller's success rate
+FAILED_STATUSES = ('cancelled', 'refunded', 'failed')
+
+ORDER_FIELDS = ('orders', 'completed_orders', 'failed_orders', 'units_sold', 'revenue_cents')
+BREAKDOWN_FIELDS = ('orders', 'completed_orders', 'units_sold', 'revenue_cents')
+DIMENSIONS = ('platform', 'category')
+
+def _cents(amount):
+    return int((Decimal(str(amount or 0)) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+class StatDeltas:
+    """Counter changes accumulated over one flush"""
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.sellers = defaultdict(lambda: defaultdict(int))
+        self.breakdown = defaultdict(lambda: defaultdict(int))
+        self.account_sales = defaultdict(int)
+        # Listings sold or failed in the flush, whose success rate is refreshed
+        self.rate_accounts = set()
+
+    def add_order(self, values, listing, sign):
+        """Count an order with (seller_id, account_id, status, quantity, total) ``values``"""
+        seller_id, account_id, status, quantity, total = values
+        completed = status == COMPLETED
+        contribution = {
+            'orders': 1,
+            'completed_orders': int(completed),
+            'failed_orders': int(status in FAILED_STATUSES),
+            'units_sold': (quantity or 0) if completed else 0,
+            'revenue_cents': _cents(total) if completed else 0
+        }
+        for field, value in contribution.items():
+            self.counters[field] += sign * value
+            self.sellers[seller_id][field] += sign * value
+        if listing is not None:
+            for key in zip(DIMENSIONS, listing):
+                for field in BREAKDOWN_FIELDS:
+                    self.breakdown[key][field] += sign * contribution[field]
+        if completed:
+            self.account_sales[account_id] += sign * contribution['units_sold']
+        if completed or status in FAILED_STATUSES:
+            self.rate_accounts.add(account_id)
+
+    def add_listing(self, seller_id, sign):
+        self.counters['accounts'] += sign
+        self.sellers[seller_id]['listings'] += sign
+
+    def merge(self, other):
+        for name, value in other.counters.items():
+            self.counters[name] += value
+        for target, source in ((self.sellers, other.sellers), (self.breakdown, other.breakdown)):
+            for key, fields in source.items():
+                for field, value in fields.items():
+                    target[key][field] += value
+        for account_id, units in other.account_sales.items():
+            self.account_sales[account_id] += units
+        self.rate_accounts |= other.rate_accounts
+
+    def __bool__(self):
+        # Seller and breakdown deltas never occur without a counter delta
+        return bool(self.counters or self.account_sales or self.rate_accounts)
+
+# Declared with active_history on Order, so their committed values are at hand
+_ORDER_ATTRS = ('seller_id', 'account_id', 'status', 'quantity', 'total_amount')
+
+def _committed(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else getattr(obj, attr)
+
+def _order_values(order, committed=False):
+    if committed:
+        return tuple(_committed(order, attr) for attr in _ORDER_ATTRS)
+    return tuple(getattr(order, attr) for attr in _ORDER_ATTRS)
+
+def _listings(session, connection, account_ids):
+    """Map account id -> (platform, category) breakdown keys"""
+    listings = {}
+    for account_id in account_ids:
+        # The view placing an order has usually loaded its account already
+        account = session.identity_map.get(identity_key(Account, account_id))
+        if account is not None and not inspect(account).unloaded & {'platform', 'category_id'}:
+            listings[account_id] = ((account.platform or '').lower(), str(account.category_id))
+    missing = account_ids - listings.keys()
+    if missing:
+        rows = connection.execute(
+            select(Account.id, func.lower(Account.platform), Account.category_id)
+            .where(Account.id.in_(missing))
+        )
+        listings.update((account_id, (platform, str(category_id))) for account_id, platform, category_id in rows)
+    return listings
+
+def collect_deltas(session, connection):
+    """Compute the statistics changes of the flush in progress"""
+    deltas = StatDeltas()
+    orders = []
+    for order in session.new:
+        if isinstance(order, Order):
+            orders.append((_order_values(order), 1))
+    for order in session.deleted:
+        if isinstance(order, Order):
+            orders.append((_order_values(order, committed=True), -1))
+    for order in session.dirty:
+        if isinstance(order, Order) and session.is_modified(order):
+            before, after = _order_values(order, committed=True), _order_values(order)
+            if before != after:
+                orders.append((before, -1))
+                orders.append((after, 1))
+
+    listings = _listings(session, connection, {values[1] for values, _ in orders})
+    for values, sign in orders:
+        deltas.add_order(values, listings.get(values[1]), sign)
+
+    for obj in session.new:
+        if isinstance(obj, Account):
+            deltas.add_listing(obj.seller_id, 1)
+        elif isinstance(obj, User):
+            deltas.counters['users'] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Account):
+            deltas.add_listing(_committed(obj, 'seller_id'), -1)
+        elif isinstance(obj, User):
+            deltas.counters['users'] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Account) and _committed(obj, 'seller_id') != obj.seller_id:
+            deltas.add_listing(_committed(obj, 'seller_id'), -1)
+            deltas.add_listing(obj.seller_id, 1)
+    return deltas
+
+# Fields each statistics table accumulates
+_INCREMENTED = {
+    StatCounter: ('value',),
+    SellerStats: ('listings',) + ORDER_FIELDS,
+    SalesBreakdown: BREAKDOWN_FIELDS
+}
+
+@lru_cache(maxsize=None)
+def _upsert(dialect, model):
+    """INSERT ... ON CONFLICT DO UPDATE adding the inserted values to an existing row"""
+    insert = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}.get(dialect)
+    if insert is None:
+        return None
+    table = model.__table__
+    statement = insert(table)
+    assignments = {field: table.c[field] + statement.excluded[field] for field in _INCREMENTED[model]}
+    if 'updated_at' in table.c:
+        assignments['updated_at'] = statement.excluded.updated_at
+    return statement.on_conflict_do_update(index_elements=list(table.primary_key.columns), set_=assignments)
+
+def _increment(connection, model, rows):
+    """Add each row's deltas to the stored row with the same primary key, creating it if needed.
+
+    ``rows`` are dicts of primary key values plus every field in _INCREMENTED[model].
+    """
+    table = model.__table__
+    if 'updated_at' in table.c:
+        now = datetime.utcnow()
+        rows = [{**row, 'updated_at': now} for row in rows]
+    statement = _upsert(connection.dialect.name, model)
+    if statement is not None:
+        connection.execute(statement, rows)
+        return
+    # Portable fallback: update, and insert when the row does not exist yet
+    for row in rows:
+        condition = [column == row[column.name] for column in table.primary_key.columns]
+        values = {field: table.c[field] + row[field] for field in _INCREMENTED[model]}
+        if 'updated_at' in row:
+            values['updated_at'] = row['updated_at']
+        if connection.execute(table.update().where(*condition).values(values)).rowcount == 0:
+            connection.execute(table.insert().values(row))
+
+def increment_counter(connection, name, amount=1):
+    """Add ``amount`` to the StatCounter ``name`` on ``connection``, creating it if needed"""
+    _increment(connection, StatCounter, [{'name': name, 'value': amount}])
+
+def _success_rate(completed, failed):
+    # 100.0 is a numeric literal on PostgreSQL, where round(double, int) does not exist
+    finished = func.nullif(completed + failed, 0)
+    return func.coalesce(func.round(literal_column('100.0') * completed / finished, 2), 0)
+
+def _seller_success_rate():
+    """Correlated subquery for the success rate of an account's seller"""
+    return (
+        select(_success_rate(SellerStats.completed_orders, SellerStats.failed_orders))
+        .where(SellerStats.seller_id == Account.seller_id)
+        .scalar_subquery()
+    )
+
+def apply_deltas(connection, deltas):
+    """Write accumulated deltas"""
+    counters = [{'name': name, 'value': value} for name, value in deltas.counters.items() if value]
+    if counters:
+        _increment(connection, StatCounter, counters)
+    sellers = [
+        {'seller_id': seller_id, **{field: fields[field] for field in _INCREMENTED[SellerStats]}}
+        for seller_id, fields in deltas.sellers.items() if any(fields.values())
+    ]
+    if sellers:
+        _increment(connection, SellerStats, sellers)
+    breakdown = [
+        {'dimension': dimension, 'key': key, **{field: fields[field] for field in BREAKDOWN_FIELDS}}
+        for (dimension, key), fields in deltas.breakdown.items() if key is not None and any(fields.values())
+    ]
+    if breakdown:
+        _increment(connection, SalesBreakdown, breakdown)
+
+    # Only the listings the orders were for are touched: their seller's other
+    # listings pick up the new rate at their next sale or the next reconcile.
+    # updated_at is kept, so these derived figures do not churn ETags and the
+    # listing snapshot; cached copies show them with the listing's next change.
+    for account_id in deltas.account_sales.keys() | deltas.rate_accounts:
+        values = {}
+        if deltas.account_sales.get(account_id):
+            values['total_sales'] = func.coalesce(Account.total_sales, 0) + deltas.account_sales[account_id]
+        if account_id in deltas.rate_accounts:
+            values['success_rate'] = _seller_success_rate()
+        if values:
+            connection.execute(
+                update(Account.__table__)
+                .where(Account.id == account_id)
+                .values(updated_at=Account.updated_at, **values)
+            )
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stats(session, flush_context):
+    deltas = collect_deltas(session, session.connection())
+    if not deltas:
+        return
+    if session.in_nested_transaction():
+        # Write inside the savepoint so rolling back to it discards them too
+        apply_deltas(session.connection(), deltas)
+    else:
+        # Net out all flushes of the transaction (e.g. an order inserted and
+        # then completed) and touch the shared counter rows once, at commit
+        session.info.setdefault('stat_deltas', StatDeltas()).merge(deltas)
+
+@event.listens_for(Session, 'before_commit')
+def _write_stats(session):
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    deltas = session.info.pop('stat_deltas', None)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_stats(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('stat_deltas', None)
+
+def record_new_listings(seller_id, count):
+    """Count listings inserted by a bulk statement, in the current transaction"""
+    deltas = StatDeltas()
+    deltas.add_listing(seller_id, count)
+    apply_deltas(db.session.connection(), deltas)
+
+def marketplace_stats():
+    """Dashboard statistics from the materialized tables"""
+    counters = {name: value for name, value in db.session.query(StatCounter.name, StatCounter.value)}
+    breakdown = {dimension: [] for dimension in DIMENSIONS}
+    # Category keys are ids stored as text; the name is joined in the same query
+    rows = (
+        db.session.query(SalesBreakdown, Category.name)
+        .outerjoin(Category, (SalesBreakdown.dimension == 'category') & (cast(Category.id, String) == SalesBreakdown.key))
+        .order_by(SalesBreakdown.revenue_cents.desc(), SalesBreakdown.key)
+    )
+    for row, name in rows:
+        entry = row.to_dict()
+        if row.dimension == 'category':
+            entry['name'] = name
+        breakdown[row.dimension].append(entry)
+    top_sellers = SellerStats.query.order_by(SellerStats.revenue_cents.desc()).limit(10)
+    return {
+        'total_accounts': counters.get('accounts', 0),
+        'total_users': counters.get('users', 0),
+        'total_orders': counters.get('orders', 0),
+        'completed_orders': counters.get('completed_orders', 0),
+        'failed_orders': counters.get('failed_orders', 0),
+        'units_sold': counters.get('units_sold', 0),
+        'revenue': counters.get('revenue_cents', 0) / 100,
+        'revenue_by_platform': breakdown['platform'],
+        'revenue_by_category': breakdown['category'],
+        'top_sellers': [seller.to_dict() for seller in top_sellers]
+    }
+
+def _order_aggregates(*group_by):
+    completed = Order.status == COMPLETED
+    return select(
+        *group_by,
+        func.count(Order.id),
+        func.count(Order.id).filter(completed),
+        func.count(Order.id).filter(Order.status.in_(FAILED_STATUSES)),
+        func.coalesce(func.sum(Order.quantity).filter(completed), 0),
+        func.coalesce(func.sum(Order.total_amount).filter(completed), 0)
+    ).group_by(*group_by)
+
+def _compute_stats():
+    """Recompute all statistics rows from the base tables"""
+    counters = {'accounts': db.session.query(func.count(Account.id)).scalar(),
+                'users': db.session.query(func.count(User.id)).scalar()}
+    sellers = defaultdict(lambda: dict.fromkeys(('listings',) + ORDER_FIELDS, 0))
+    for seller_id, listings in db.session.execute(select(Account.seller_id, func.count(Account.id)).group_by(Account.seller_id)):
+        sellers[seller_id]['listings'] = listings
+
+    totals = dict.fromkeys(ORDER_FIELDS, 0)
+    for seller_id, *values in db.session.execute(_order_aggregates(Order.seller_id)):
+        values[-1] = _cents(values[-1])
+        sellers[seller_id].update(zip(ORDER_FIELDS, values))
+        for field, value in zip(ORDER_FIELDS, values):
+            totals[field] += value
+    counters.update(totals)
+
+    breakdown = {}
+    for dimension, column in (('platform', func.lower(Account.platform)), ('category', Account.category_id)):
+        query = _order_aggregates(column).join(Account, Account.id == Order.account_id)
+        for key, orders, completed, _, units, revenue in db.session.execute(query):
+            if key is not None:
+                breakdown[(dimension, str(key))] = dict(zip(BREAKDOWN_FIELDS, (orders, completed, units, _cents(revenue))))
+    return counters, dict(sellers), breakdown
+
+def reconcile_stats(listings=True):
+    """Rebuild the statistics tables from the base tables and commit.
+
+    With ``listings`` the denormalised ``total_sales`` and ``success_rate``
+    columns of every account are recomputed too. Returns the number of rows
+    whose stored values had drifted, per table.
+    """
+    counters, sellers, breakdown = _compute_stats()
+    drift = {}
+
+    stored = {row.name: row.value for row in StatCounter.query}
+    drift['counters'] = sum(stored.get(name, 0) != value for name, value in counters.items())
+    stored = {row.seller_id: {field: getattr(row, field) for field in ('listings',) + ORDER_FIELDS} for row in SellerStats.query}
+    drift['sellers'] = sum(stored.get(seller_id) != fields for seller_id, fields in sellers.items()) + len(stored.keys() - sellers.keys())
+    stored = {(row.dimension, row.key): {field: getattr(row, field) for field in BREAKDOWN_FIELDS} for row in SalesBreakdown.query}
+    drift['breakdown'] = sum(stored.get(key) != fields for key, fields in breakdown.items()) + len(stored.keys() - breakdown.keys())
+
+    # Bulk statements bypass the after_flush hook, so the rebuild is not counted twice.
+    # Counters not derived from the base tables (e.g. the catalogue version) are kept.
+    db.session.execute(StatCounter.__table__.delete().where(StatCounter.name.in_(list(counters))))
+    db.session.execute(SellerStats.__table__.delete())
+    db.session.execute(SalesBreakdown.__table__.delete())
+    if counters:
+        db.session.execute(StatCounter.__table__.insert(), [{'name': name, 'value': value} for name, value in counters.items()])
+    if sellers:
+        db.session.execute(SellerStats.__table__.insert(), [{'seller_id': seller_id, **fields} for seller_id, fields in sellers.items()])
+    if breakdown:
+        db.session.execute(SalesBreakdown.__table__.insert(), [
+            {'dimension': dimension, 'key': key, **fields} for (dimension, key), fields in breakdown.items()
+        ])
+
+    if listings:
+        sales = (
+            select(func.coalesce(func.sum(Order.quantity), 0))
+            .where(Order.account_id == Account.id, Order.status == COMPLETED)
+            .scalar_subquery()
+        )
+        rate = func.coalesce(_seller_success_rate(), 0)
+        result = db.session.execute(
+            update(Account)
+            .where((func.coalesce(Account.total_sales, -1) != sales) | (func.coalesce(Account.success_rate, -1) != rate))
+            .values(total_sales=sales, success_rate=rate)
+            .execution_options(synchronize_session=False)
+        )
+        drift['listings'] = result.rowcount
+
+    db.session.commit()
+    return drift
+
+def ensure_stats():
+    """Populate the statistics tables when they are empty, e.g. right after being created"""
+    if db.session.query(StatCounter.name).first() is None:
+        reconcile_stats(listings=False)
@@ -0,0 +1,67 @@
+import logging
+from itertools import chain
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# (model classes, callback) pairs registered through on_commit()
+_listeners = []
+
+def on_commit(models, callback):
+    """Call ``callback(changes)`` after any commit that touched one of ``models``.
+
+    ``changes`` maps each changed model class to the set of primary keys that
+    were inserted, updated or deleted, or to ``None`` when a bulk statement
+    changed rows that cannot be enumerated.
+    """
+    _listeners.append((tuple(models), callback))
+
+def _changes(session):
+    return session.info.setdefault('changed_models', {})
+
+def _mark(session, model, key):
+    changes = _changes(session)
+    if key is None:
+        changes[model] = None
+    elif changes.setdefault(model, set()) is not None:
+        changes[model].add(key)
+
+def mark_changed(session, model, key=None):
+    """Record a change made outside the unit of work, e.g. by a Core statement.
+
+    ``key=None`` reports that unknown rows of ``model`` changed.
+    """
+    _mark(session, model, key)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        key = inspect(obj).mapper.primary_key_from_instance(obj)
+        _mark(session, type(obj), key[0] if len(key) == 1 else tuple(key))
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _mark(orm_execute_state.session, mapper.class_, None)
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch(session):
+    changes = session.info.pop('changed_models', None)
+    if not changes:
+        return
+    for models, callback in _listeners:
+        relevant = {model: keys for model, keys in changes.items() if issubclass(model, models)}
+        if relevant:
+            try:
+                callback(relevant)
+            except Exception:
+                # The transaction is already committed; never turn that into an error
+                logger.exception('Commit listener %r failed', callback)
+
+@event.listens_for(Session, 'after_transaction_end')
+def _reset(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('changed_models', None)
@@ -0,0 +1,128 @@
+import itertools
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+# Time until which a client that just wrote reads from the primary. The frontend
+# calls the API cross-origin without credentials, so cookies never come back;
+# such clients echo the response header on their next requests instead.
+PRIMARY_COOKIE = 'db_primary_until'
+PRIMARY_HEADER = 'X-Primary-Until'
+
+class RoutingSession(Session):
+    """Session that sends reads from replica-enabled views to a read replica.
+
+    Everything else goes to the primary: writes, flushes, anything after the
+    session has written, and requests pinned to the primary for
+    read-your-writes consistency.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) \
+                and not self.info.get('wrote') and _replica_allowed():
+            engine = self._replica_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_engine(self):
+        # Stick to one replica per session so a request sees a single snapshot
+        if 'replica' not in self.info:
+            replicas = current_app.extensions.get('db_replicas')
+            self.info['replica'] = replicas.next_engine(self._db) if replicas else None
+        return self.info['replica']
+
+class _Replicas:
+    def __init__(self, keys):
+        self.keys = keys
+        self._counter = itertools.count()
+
+    def next_engine(self, db):
+        return db.engines[self.keys[next(self._counter) % len(self.keys)]]
+
+def _replica_allowed():
+    return has_app_context() and has_request_context() and g.get('db_replica_allowed', False)
+
+def _pinned_to_primary():
+    if request.headers.get('X-Read-Your-Writes', '').lower() in ('1', 'true'):
+        return True
+    for until in (request.headers.get(PRIMARY_HEADER), request.cookies.get(PRIMARY_COOKIE)):
+        try:
+            if until and float(until) > time.time():
+                return True
+        except ValueError:
+            pass
+    return False
+
+def read_replica(view):
+    """Allow a read-only view to query a replica unless the client must read its own writes.
+
+    A client is pinned to the primary by ``X-Read-Your-Writes: 1``, or until
+    the time in the ``X-Primary-Until`` header (echoed from a write response)
+    or the cookie of the same name's value has passed.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_app.extensions.get('db_replicas') and not _pinned_to_primary():
+            g.db_replica_allowed = True
+        return view(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def primary_reads():
+    """Run the queries of the block on the primary, even in a replica-enabled view.
+
+    For data that outlives the request, such as process-wide caches: built
+    from a lagging replica right after an invalidating commit, a cache
+    would hold the stale rows until its TTL, even for clients pinned to
+    the primary.
+    """
+    allowed = g.pop('db_replica_allowed', False) if has_app_context() else False
+    try:
+        yield
+    finally:
+        if allowed:
+            g.db_replica_allowed = True
+
+def _mark_written(session):
+    session.info['wrote'] = True
+    if has_request_context():
+        g.db_wrote = True
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context):
+    _mark_written(session)
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _after_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_written(orm_execute_state.session)
+
+def _pin_writer_to_primary(response):
+    window = current_app.config.get('READ_YOUR_WRITES_SECONDS')
+    if g.get('db_wrote') and window:
+        until = f'{time.time() + window:.3f}'
+        response.headers[PRIMARY_HEADER] = until
+        response.set_cookie(PRIMARY_COOKIE, until, max_age=window, httponly=True, samesite='Lax')
+    return response
+
+def init_app(app, engine_options):
+    """Register SQLALCHEMY_REPLICA_URIS as binds; must run before db.init_app().
+
+    ``engine_options(uri)`` returns the engine options for a replica URI.
+    """
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    keys = []
+    for index, uri in enumerate(uris):
+        key = f'replica_{index}'
+        binds[key] = {'url': uri, **engine_options(uri)}
+        keys.append(key)
+    
+    if keys:
+        app.extensions['db_replicas'] = _Replicas(keys)
+        app.after_request(_pin_writer_to_primary)
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, stream_with_context
+from src.extensions import db
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 1000
+
+def export_fields(model, requested=None, exclude=()):
+    """Resolve a comma-separated ``fields`` parameter against the model's columns"""
+    available = [column.key for column in model.__table__.columns if column.key not in exclude]
+    if not requested:
+        return available
+    fields = [field.strip() for field in requested.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return fields
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _ndjson_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, map(_plain, row))), separators=(',', ':')) + '\n'
+
+def _csv_lines(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def stream_export(model, fields, fmt, filename, batch_size=EXPORT_BATCH_SIZE):
+    """Stream every row of ``model`` as NDJSON or CSV, selecting only ``fields``.
+
+    Rows come from a server-side cursor in ``batch_size`` chunks and are
+    encoded one at a time, so memory use does not grow with the table.
+    """
+    query = db.session.query(*[getattr(model, field) for field in fields]) \
+        .order_by(model.id) \
+        .execution_options(yield_per=batch_size)
+    encode = _csv_lines if fmt == 'csv' else _ndjson_lines
+    
+    return Response(
+        stream_with_context(encode(query, fields)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+    )
@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import current_app, make_response, request
+from werkzeug.http import is_resource_modified
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is offered on its own
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/html',
+    'text/plain',
+}
+
+def _encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        # Brotli quality runs 0-11; map the shared 1-9 level onto it
+        return brotli.compress(data, quality=min(11, level + 2))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def conditional(validators):
+    """Answer conditional GETs from cheap validators before running the view.
+
+    ``validators()`` returns ``(version, last_modified)`` summarising the data
+    behind the response, ``last_modified`` being a naive UTC datetime or
+    None. When the client already holds that version the view is skipped
+    and a 304 is returned.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version, last_modified = validators()
+            etag = hashlib.sha1(version.encode('utf-8')).hexdigest()[:20]
+            if last_modified is not None:
+                # HTTP dates are whole seconds in UTC
+                last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                response.last_modified = last_modified
+                return response
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
+
+def _add_validators(response):
+    """Give plain GET JSON responses a weak ETag and honour If-None-Match"""
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200 \
+            or response.is_streamed or response.mimetype != 'application/json':
+        return response
+    if not response.get_etag()[0]:
+        response.add_etag(weak=True)
+    return response.make_conditional(request)
+
+def _compress_response(response):
+    config = current_app.config
+    if response.status_code < 200 or response.status_code in (204, 304) or response.is_streamed \
+            or 'Content-Encoding' in response.headers \
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < config['COMPRESSION_MIN_SIZE']:
+        return response
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+    
+    response.set_data(_compress(data, encoding, config['COMPRESSION_LEVEL']))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from the identity ones, so a strong ETag must become weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def _after_request(response):
+    return _compress_response(_add_validators(response))
+
+def init_app(app):
+    app.config.setdefault('COMPRESSION_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESSION_LEVEL', 6)
+    app.after_request(_after_request)
@@ -0,0 +1,231 @@
+"""Request, SQL and connection pool metrics in the Prometheus text format.
+
+Every request records its latency, status, the number of SQL statements it
+ran and the time they took; every statement is timed through the engines'
+``before/after_cursor_execute`` events and logged to ``src.slow_queries``
+when it exceeds SLOW_QUERY_MS. Pool gauges are read when ``/metrics`` is
+scraped. Observations are a dictionary lookup and one locked increment, so
+the overhead per request is a few microseconds.
+
+Each worker process keeps its own metrics and labels them with its ``pid``;
+scrape every worker, or aggregate across ``pid`` in queries.
+"""
+import hmac
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, current_app, got_request_exception, has_request_context, request
+from sqlalchemy import event
+from src.extensions import db
+
+slow_query_logger = logging.getLogger('src.slow_queries')
+
+# Seconds; spans cached reads (~1 ms) to slow exports and bcrypt logins
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_local = threading.local()
+
+def _labels(names, values):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self, const):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield f'{self.name}{_labels(self.labels + const[0], label_values + const[1])} {value}'
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self, const):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            values = [(label_values, list(counts), total) for label_values, (counts, total) in self._values.items()]
+        names = self.labels + const[0]
+        for label_values, counts, total in values:
+            label_values += const[1]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels(names + ("le",), label_values + (bound,))} {cumulative}'
+            yield f'{self.name}_sum{_labels(names, label_values)} {total}'
+            yield f'{self.name}_count{_labels(names, label_values)} {cumulative}'
+
+class Gauge:
+    """Value read from ``collect()`` -> [(label values, value)] at scrape time"""
+
+    def __init__(self, name, help, labels, collect):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.collect = collect
+
+    def render(self, const):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} gauge'
+        for label_values, value in self.collect():
+            yield f'{self.name}{_labels(self.labels + const[0], tuple(label_values) + const[1])} {value}'
+
+class RequestStats:
+    """SQL work done by the request on this thread"""
+    __slots__ = ('started', 'queries', 'query_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+
+class Metrics:
+    def __init__(self, app):
+        self.app = app
+        self.slow_query_seconds = (app.config['SLOW_QUERY_MS'] or 0) / 1000
+        self.requests = Counter('http_requests_total', 'Requests handled, by endpoint and status.',
+                                ('method', 'endpoint', 'status'))
+        self.latency = Histogram('http_request_duration_seconds', 'Time to produce a response.',
+                                 ('method', 'endpoint'))
+        self.exceptions = Counter('http_request_exceptions_total', 'Unhandled exceptions raised by views.',
+                                  ('endpoint', 'exception'))
+        self.request_queries = Histogram('http_request_sql_queries', 'SQL statements run per request.',
+                                         ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.request_query_time = Histogram('http_request_sql_duration_seconds',
+                                            'Time per request spent executing SQL.', ('endpoint',))
+        self.queries = Histogram('sql_query_duration_seconds', 'Duration of single SQL statements.',
+                                 ('operation',), QUERY_BUCKETS)
+        self.slow_queries = Counter('sql_slow_queries_total', 'Statements slower than SLOW_QUERY_MS.',
+                                    ('operation',))
+        self.pool = Gauge('db_pool_connections', 'Connections of each engine pool by state.',
+                          ('bind', 'state'), self._pool_connections)
+        self.families = [self.requests, self.latency, self.exceptions, self.request_queries,
+                         self.request_query_time, self.queries, self.slow_queries, self.pool]
+        self.const = (('pid',), (os.getpid(),))
+
+    def _pool_connections(self):
+        with self.app.app_context():
+            engines = dict(db.engines)
+        for bind, engine in engines.items():
+            pool = engine.pool
+            if not hasattr(pool, 'checkedout'):
+                continue
+            name = bind or 'default'
+            yield (name, 'checked_out'), pool.checkedout()
+            yield (name, 'idle'), pool.checkedin()
+            if hasattr(pool, 'overflow'):
+                yield (name, 'overflow'), max(pool.overflow(), 0)
+                yield (name, 'size'), pool.size()
+
+    def render(self):
+        # Processes forked after init_app (gunicorn workers) report their own pid
+        self.const = (('pid',), (os.getpid(),))
+        lines = []
+        for family in self.families:
+            lines.extend(family.render(self.const))
+        return '\n'.join(lines) + '\n'
+
+    # Request hooks
+
+    def before_request(self):
+        _local.request = RequestStats()
+
+    def after_request(self, response):
+        stats = getattr(_local, 'request', None)
+        if stats is None:
+            return response
+        _local.request = None
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        # For streamed responses (exports, event streams) this is the time to the first byte
+        self.latency.observe(time.perf_counter() - stats.started, request.method, endpoint)
+        self.requests.inc(request.method, endpoint, response.status_code)
+        self.request_queries.observe(stats.queries, endpoint)
+        self.request_query_time.observe(stats.query_seconds, endpoint)
+        return response
+
+    def teardown_request(self, exc):
+        _local.request = None
+
+    def request_exception(self, sender, exception, **extra):
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        self.exceptions.inc(endpoint, type(exception).__name__)
+
+    # Engine hooks
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+        self.queries.observe(elapsed, operation)
+        stats = getattr(_local, 'request', None)
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+        if self.slow_query_seconds and elapsed >= self.slow_query_seconds:
+            self.slow_queries.inc(operation)
+            slow_query_logger.warning(
+                'Slow query (%.1f ms) during %s: %s', elapsed * 1000,
+                request.path if has_request_context() else 'work outside a request', ' '.join(statement.split())[:2000]
+            )
+
+def _metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(current_app.extensions['metrics'].render(), mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    """Install the hooks and ``GET /metrics`` when METRICS_ENABLED; must run after db.init_app().
+
+    Register it before other after_request hooks: Flask runs those in reverse
+    order, so the measured latency then includes their work.
+    """
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    metrics = app.extensions['metrics'] = Metrics(app)
+    app.before_request(metrics.before_request)
+    app.after_request(metrics.after_request)
+    app.teardown_request(metrics.teardown_request)
+    got_request_exception.connect(metrics.request_exception, app)
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', metrics.before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', metrics.after_cursor_execute)
+    app.add_url_rule('/metrics', 'metrics', _metrics_view)
@@ -0,0 +1,193 @@
+"""On-demand profiling of single requests, for admins debugging production.
+
+With PROFILING_ENABLED set, a request carrying ``X-Profile: 1`` (or the
+``_profile=1`` parameter) and an admin JWT runs under cProfile, and the SQL
+statements it executes are timed. The response is replaced by a JSON
+report: status and duration of the real response, time spent in SQL, the
+statements, and the functions with the highest cumulative time. The raw
+pstats file is kept in PROFILE_DIR (the newest PROFILE_KEEP of them) and can
+be downloaded from ``GET /api/admin/profiles/<id>`` for ``python -m pstats``
+or snakeviz.
+
+Without PROFILING_ENABLED no hook is installed, so requests pay nothing.
+For streamed responses only the work up to the first byte is profiled.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import event
+from src.extensions import db
+from src.auth.identity import load_identity_user
+
+PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{9}-[0-9a-f]{8}$')
+
+# cProfile cannot profile two threads of one process at once; later requests are served unprofiled
+_lock = threading.Lock()
+_local = threading.local()
+
+def _requested():
+    return request.headers.get('X-Profile') == '1' or request.args.get('_profile') == '1'
+
+def _is_admin():
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        return False
+    user = load_identity_user(identity) if identity is not None else None
+    return bool(user and user.is_admin)
+
+def _short_path(filename):
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+def _top_functions(stats, limit):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': f'{_short_path(filename)}:{line}({name})',
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+def _new_id():
+    """Time-ordered id, e.g. 20260101T120000123-1a2b3c4d (to the millisecond)"""
+    now = time.time()
+    return f'{time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))}{int(now * 1000) % 1000:03d}-{uuid.uuid4().hex[:8]}'
+
+def profile_dir():
+    return current_app.config['PROFILE_DIR']
+
+def profile_path(profile_id):
+    """Path of a stored pstats file, or None for an id that is malformed or unknown"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(profile_dir(), f'{profile_id}.pstats')
+    return path if os.path.exists(path) else None
+
+def stored_profiles():
+    """Summaries of the stored profiles, newest first"""
+    try:
+        names = sorted((name for name in os.listdir(profile_dir()) if name.endswith('.json')), reverse=True)
+    except FileNotFoundError:
+        return []
+    summaries = []
+    for name in names:
+        with open(os.path.join(profile_dir(), name)) as f:
+            report = json.load(f)
+        summaries.append({
+            **{key: report[key] for key in ('id', 'method', 'path', 'status', 'duration_ms')},
+            'sql_count': report['sql']['count'],
+            'sql_duration_ms': report['sql']['duration_ms']
+        })
+    return summaries
+
+def _store(profiler, report):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(directory, f'{report["id"]}.pstats'))
+    with open(os.path.join(directory, f'{report["id"]}.json'), 'w') as f:
+        json.dump(report, f)
+    # Ids sort by time, so everything before the newest PROFILE_KEEP goes
+    stored = sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+    for profile_id in stored[:-current_app.config['PROFILE_KEEP']]:
+        for suffix in ('.json', '.pstats'):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+def _before_request():
+    if not _requested() or not _is_admin():
+        return
+    if not _lock.acquire(blocking=False):
+        g.profile_skipped = 'busy'
+        return
+    _local.statements = []
+    g.profile_started = time.perf_counter()
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+
+def _after_request(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        if g.get('profile_skipped'):
+            response.headers['X-Profile-Skipped'] = g.profile_skipped
+        return response
+    profiler.disable()
+    duration = time.perf_counter() - g.pop('profile_started')
+    statements = _local.statements
+    _local.statements = None
+    _lock.release()
+
+    config = current_app.config
+    stats = pstats.Stats(profiler)
+    report = {
+        'id': _new_id(),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'status': response.status_code,
+        'response_bytes': None if response.is_streamed else len(response.get_data()),
+        'duration_ms': round(duration * 1000, 3),
+        'sql': {
+            'count': len(statements),
+            'duration_ms': round(sum(elapsed for _, elapsed in statements) * 1000, 3),
+            'statements': [{'statement': statement, 'duration_ms': round(elapsed * 1000, 3)}
+                           for statement, elapsed in statements]
+        },
+        'functions': _top_functions(stats, config['PROFILE_TOP_FUNCTIONS'])
+    }
+    _store(profiler, report)
+    response = jsonify(report)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def _teardown_request(exc):
+    # after_request did not run (the response could not be produced); stop profiling anyway
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _local.statements = None
+        _lock.release()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, 'statements', None) is not None and context is not None:
+        context._profile_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_profile_started', None)
+    statements = getattr(_local, 'statements', None)
+    if started is not None and statements is not None:
+        # Parameters are left out; they can hold credentials
+        statements.append((' '.join(statement.split()), time.perf_counter() - started))
+
+def init_app(app):
+    """Install the profiling hooks when PROFILING_ENABLED; must run after db.init_app().
+
+    Register it after CORS and http_caching: Flask runs after_request hooks
+    in reverse order, so the report then replaces the response before those
+    hooks add their headers and compress it, and ``response_bytes`` is the
+    size of the uncompressed body.
+    """
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
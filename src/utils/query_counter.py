@@ -0,0 +1,60 @@
+import threading
+from functools import wraps
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view runs more SQL statements than its declared budget"""
+
+class QueryCounter:
+    """Counts the SQL statements executed on the current thread while active"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __enter__(self):
+        stack = getattr(_local, 'counters', None)
+        if stack is None:
+            stack = _local.counters = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.counters.remove(self)
+        return False
+
+def count_queries():
+    """Context manager recording every statement executed inside the block"""
+    return QueryCounter()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_local, 'counters', ()):
+        counter.count += 1
+        counter.statements.append(statement)
+
+def query_budget(max_queries):
+    """Fail a view that executes more than ``max_queries`` statements.
+
+    Only enforced when ``ASSERT_QUERY_BUDGET`` is set in the app config, so
+    production requests do not pay for the bookkeeping.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('ASSERT_QUERY_BUDGET'):
+                return view(*args, **kwargs)
+            with count_queries() as counter:
+                response = view(*args, **kwargs)
+            if counter.count > max_queries:
+                raise QueryBudgetExceeded(
+                    f'{view.__name__} ran {counter.count} queries, budget is {max_queries}:\n'
+                    + '\n'.join(counter.statements)
+                )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,147 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+try:
+    import redis
+except ImportError:  # optional: only needed for a shared redis:// store
+    redis = None
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after):
+        super().__init__('Rate limit exceeded')
+        self.retry_after = retry_after
+
+def parse_limit(limit):
+    """Parse ``'<count>/<period>'`` or ``'<count>/<period> burst <n>'`` into (rate per second, capacity)"""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?(?:\s+burst\s+(\d+))?\s*', limit)
+    if not match:
+        raise ValueError(f'Invalid rate limit: {limit!r}')
+    count, multiplier, period, burst = match.groups()
+    seconds = int(multiplier or 1) * _PERIODS[period]
+    return int(count) / seconds, int(burst or count)
+
+class MemoryStore:
+    """Per-process token buckets, keeping at most ``maxsize`` keys (least recently used evicted)"""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, cost=1):
+        """Take ``cost`` tokens from the bucket at ``key``; return seconds to wait, 0 when allowed"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return wait
+
+class RedisStore:
+    """Token buckets shared by every worker process through Redis"""
+
+    # Refill and take atomically on the server; buckets expire once full again
+    _SCRIPT = """
+    local rate, capacity, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local wait = 0
+    if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        if redis is None:
+            raise RuntimeError('RATE_LIMIT_STORAGE_URL points at Redis but the redis package is not installed')
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self._SCRIPT)
+
+    def take(self, key, rate, capacity, cost=1):
+        return float(self._take(keys=[self.prefix + key], args=[rate, capacity, cost]))
+
+def create_store(url):
+    """Build the bucket store for RATE_LIMIT_STORAGE_URL (``memory://`` or ``redis://...``)"""
+    if not url or url.startswith('memory://'):
+        return MemoryStore()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url)
+    raise ValueError(f'Unsupported RATE_LIMIT_STORAGE_URL: {url!r}')
+
+def by_ip():
+    return f'ip:{request.remote_addr}'
+
+def by_identity():
+    """Key on the JWT identity when a valid token is present, otherwise on the client IP"""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return f'user:{identity}' if identity is not None else by_ip()
+
+def rate_limit(name, default, key=by_identity):
+    """Admit requests to a view through a token bucket per client.
+
+    ``name`` identifies the bucket, so views sharing a name share a budget.
+    ``default`` is a limit such as ``'60/minute burst 20'``; RATE_LIMITS[name]
+    in the app config overrides it. Rejected requests get a 429 with a
+    Retry-After header before the view runs.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter = current_app.extensions.get('rate_limiter')
+            if limiter is not None:
+                limiter.check(name, default, key)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class RateLimiter:
+    def __init__(self, store, limits):
+        self.store = store
+        self._limits = {name: parse_limit(limit) for name, limit in limits.items()}
+
+    def check(self, name, default, key):
+        if name not in self._limits:
+            self._limits[name] = parse_limit(default)
+        rate, capacity = self._limits[name]
+        wait = self.store.take(f'{name}:{key()}', rate, capacity)
+        if wait:
+            raise RateLimitExceeded(wait)
+
+def _too_many_requests(e):
+    retry_after = max(1, int(e.retry_after + 0.999))
+    response = jsonify({'error': 'Rate limit exceeded', 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def init_app(app):
+    """Enable rate limiting unless RATE_LIMIT_ENABLED is off"""
+    app.register_error_handler(RateLimitExceeded, _too_many_requests)
+    if app.config.get('RATE_LIMIT_ENABLED', True):
+        store = create_store(app.config.get('RATE_LIMIT_STORAGE_URL'))
+        app.extensions['rate_limiter'] = RateLimiter(store, app.config.get('RATE_LIMITS') or {})
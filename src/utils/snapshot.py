@@ -0,0 +1,51 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+class Snapshot:
+    """A pre-encoded response body together with its validator"""
+    __slots__ = ('body', 'etag', 'created_at')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.created_at = time.monotonic()
+
+class SnapshotCache:
+    """In-process cache of encoded payloads, cleared wholesale on invalidate().
+
+    A generation counter guards against a build that raced with an
+    invalidation storing a payload that is already stale. With ``maxsize``
+    the least recently used keys are evicted beyond that many entries.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()
+        self._generation = 0
+
+    def get(self, key, build, ttl=None):
+        """Return the snapshot for ``key``, calling ``build()`` for bytes on a miss"""
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            generation = self._generation
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+        if snapshot is not None and (ttl is None or time.monotonic() - snapshot.created_at < ttl):
+            return snapshot
+        
+        snapshot = Snapshot(build())
+        with self._lock:
+            if generation == self._generation:
+                self._snapshots[key] = snapshot
+                self._snapshots.move_to_end(key)
+                while self.maxsize is not None and len(self._snapshots) > self.maxsize:
+                    self._snapshots.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, *args):
+        with self._lock:
+            self._generation += 1
+            self._snapshots.clear()
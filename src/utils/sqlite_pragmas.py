@@ -0,0 +1,36 @@
+from functools import partial
+from sqlalchemy import event
+from src.extensions import db
+
+def pragmas_from_config(config):
+    """The (pragma, value) pairs to run on each new SQLite connection; unset ones are skipped"""
+    cache_size_kb = config.get('SQLITE_CACHE_SIZE_KB')
+    pragmas = [
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE')),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS')),
+        ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT_MS')),
+        # A negative cache_size is a size in KiB rather than in pages
+        ('cache_size', -cache_size_kb if cache_size_kb else None),
+        ('mmap_size', config.get('SQLITE_MMAP_SIZE')),
+        ('temp_store', config.get('SQLITE_TEMP_STORE')),
+    ]
+    return [(name, value) for name, value in pragmas if value not in (None, '')]
+
+def apply_pragmas(dbapi_connection, connection_record, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+def install_pragmas(engine, pragmas):
+    """Run ``pragmas`` on every connection ``engine`` opens from now on"""
+    if engine.dialect.name == 'sqlite' and pragmas:
+        event.listen(engine, 'connect', partial(apply_pragmas, pragmas=pragmas))
+
+def init_app(app):
+    pragmas = pragmas_from_config(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            install_pragmas(engine, pragmas)
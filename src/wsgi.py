@@ -0,0 +1,8 @@
+"""WSGI entry point for production servers, e.g. ``gunicorn -c gunicorn.conf.py src.wsgi:app``.
+
+The schema is initialised once by the gunicorn master (see gunicorn.conf.py)
+rather than here, so workers importing this module do not race on DDL.
+"""
+from src.main import create_app
+
+app = create_app()